@@ -0,0 +1,187 @@
+# Copyright (C) 2018, bruinspaw <bruinspaw@gmail.com>
+#
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""All-pairs shortest paths
+Contents:
+    adjacency_matrix: weight matrix of a graph
+    floyd_warshall: Floyd-Warshall's algorithm on the weight matrix, for
+        dense graphs
+    johnson: Johnson's algorithm, reweighting the edges with Bellman-Ford's
+        algorithm and running Dijkstra's algorithm from every vertex, for
+        sparse graphs
+    matrix_path: path from the predecessor matrix
+
+Vertices are identified by the integer ids of the frozen graph, i.e. row
+and column i are the i-th vertex of graph.vertices(). The matrices are 2-
+dimensional numpy arrays if numpy is installed, else lists of arrays:
+    distance[i][j] = distance from vertex i to vertex j (inf if unreachable)
+    predecessor[i][j] = vertex before j in a shortest path from i to j (-1
+        if j is i or unreachable)
+Both algorithms raise ValueError if the graph has a negative cycle.
+
+References:
+    Cormen, Leiserson et al, Introduction to Algorithms, 3rd, 2009
+
+"""
+
+from array import array
+
+from .graph import *
+from .bellmanford import csr_bellman_ford
+from .multisource import csr_dijkstra
+
+try:
+    import numpy
+except ImportError:         # optional, for the vectorized algorithm
+    numpy = None
+
+
+def _matrix(rows, typecode):
+    """Return rows of arrays as a numpy array, if numpy is installed."""
+    if numpy is None:
+        return rows
+    dtype = numpy.float64 if typecode == 'd' else numpy.int64
+    matrix = numpy.empty((len(rows), len(rows)), dtype=dtype)
+    for i, row in enumerate(rows):
+        matrix[i] = numpy.frombuffer(row, dtype=dtype)
+    return matrix
+
+
+def adjacency_matrix(graph):
+    """Return the weight matrix of the graph: the weight of edge (i, j), 0
+    on the diagonal unless a self-loop is negative, and inf elsewhere.
+
+    """
+    offsets, targets, weights = as_frozen(graph).csr()
+    n = len(offsets) - 1
+    rows = []
+    for i in range(n):
+        row = array('d', [float('inf')]) * n
+        row[i] = 0.0
+        for k in range(offsets[i], offsets[i+1]):
+            row[targets[k]] = min(row[targets[k]], weights[k])
+        rows.append(row)
+    return _matrix(rows, 'd')
+
+
+def _initial_predecessors(distance):
+    """Predecessor matrix of the single edges of a weight matrix."""
+    n = len(distance)
+    rows = []
+    for i in range(n):
+        row = array('q', [-1]) * n
+        for j in range(n):
+            if j != i and distance[i][j] < float('inf'):
+                row[j] = i
+        rows.append(row)
+    return rows
+
+
+def floyd_warshall(graph):
+    """Floyd-Warshall's algorithm, O(V^3) on the weight matrix; with numpy,
+    each of the V rounds updates the whole matrix at once.
+    Return:
+        (distance, predecessor) matrices
+
+    """
+    distance = adjacency_matrix(graph)
+    n = len(distance)
+    if numpy is not None:
+        predecessor = numpy.where(numpy.isfinite(distance),
+                                  numpy.arange(n).reshape(n, 1), -1)
+        numpy.fill_diagonal(predecessor, -1)
+        for k in range(n):
+            through = distance[:, k:k+1] + distance[k:k+1, :]
+            better = through < distance
+            distance = numpy.where(better, through, distance)
+            predecessor = numpy.where(better, predecessor[k:k+1, :],
+                                      predecessor)
+        if (numpy.diagonal(distance) < 0).any():
+            raise ValueError('the graph has a negative cycle')
+        return distance, predecessor
+    predecessor = _initial_predecessors(distance)
+    for k in range(n):
+        dk, pk = distance[k], predecessor[k]
+        for i in range(n):
+            di, pi = distance[i], predecessor[i]
+            dik = di[k]
+            if dik == float('inf'):
+                continue
+            for j in range(n):
+                if dik + dk[j] < di[j]:
+                    di[j] = dik + dk[j]
+                    pi[j] = pk[j]
+    if any(distance[i][i] < 0 for i in range(n)):
+        raise ValueError('the graph has a negative cycle')
+    return distance, predecessor
+
+
+def johnson(graph):
+    """Johnson's algorithm, O(VE log V): Bellman-Ford's algorithm from a
+    virtual source joined to every vertex gives potentials h, the weights
+    w(u, v) + h(u) - h(v) are non-negative, and Dijkstra's algorithm runs
+    from every vertex with them.
+    Return:
+        (distance, predecessor) matrices
+
+    """
+    offsets, targets, weights = as_frozen(graph).csr()
+    n = len(offsets) - 1
+    h, unused, cycle = csr_bellman_ford(offsets, targets, weights)
+    if cycle is not None:
+        raise ValueError('the graph has a negative cycle')
+    reweighted = array('d', weights)
+    for u in range(n):
+        for k in range(offsets[u], offsets[u+1]):
+            # rounding errors must not make a weight negative
+            reweighted[k] = max(0.0, weights[k] + h[u] - h[targets[k]])
+    distances, predecessors = [], []
+    for s in range(n):
+        predecessor = array('q', [-1]) * n
+        distance = csr_dijkstra(offsets, targets, reweighted, s, predecessor)
+        for v in range(n):
+            if distance[v] < float('inf'):
+                distance[v] += h[v] - h[s]
+        distance[s] = 0.0
+        predecessor[s] = -1
+        distances.append(distance)
+        predecessors.append(predecessor)
+    return _matrix(distances, 'd'), _matrix(predecessors, 'q')
+
+
+def matrix_path(predecessor, i, j):
+    """Return the list of vertex ids of a shortest path from i to j, or an
+    empty list if there is none.
+
+    """
+    if i == j:
+        return [i]
+    if predecessor[i][j] < 0:
+        return []
+    path = [j]
+    while j != i:
+        j = int(predecessor[i][j])
+        path.append(j)
+    path.reverse()
+    return path
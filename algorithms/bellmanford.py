@@ -0,0 +1,174 @@
+# Copyright (C) 2018, bruinspaw <bruinspaw@gmail.com>
+#
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Bellman-Ford's algorithm on edge arrays
+The relaxation passes run over the CSR buffers of a frozen graph: with
+numpy, each pass relaxes all the edges at once on whole arrays; without it,
+the queue-based variant (SPFA) only scans the edges of the vertices whose
+distance changed. Both stop as soon as nothing changes, and report the
+vertices of a negative cycle instead of looping on it.
+
+Vertices are identified by the integer ids of the frozen graph.
+
+"""
+
+from array import array
+from collections import deque
+
+from .graph import *
+
+try:
+    import numpy
+except ImportError:         # optional, for the vectorized passes
+    numpy = None
+
+
+def _predecessor_cycle(predecessor):
+    """Return a cycle of the predecessor graph as a list of vertex ids in the
+    order of its edges, or None if the graph is a forest (-1 meaning no
+    predecessor).
+
+    """
+    n = len(predecessor)
+    walk = array('q', [-1]) * n     # start of the walk that visited v
+    for start in range(n):
+        v = start
+        while v >= 0 and walk[v] < 0:
+            walk[v] = start
+            v = predecessor[v]
+        if v >= 0 and walk[v] == start:
+            cycle = [v]
+            u = predecessor[v]
+            while u != v:
+                cycle.append(u)
+                u = predecessor[u]
+            cycle.reverse()
+            return cycle
+    return None
+
+
+def _vectorized(offsets, targets, weights, distance, predecessor):
+    """Passes relaxing every edge with numpy arrays, from the distances of
+    the previous pass. Return (distance, predecessor, cycle).
+
+    """
+    n = len(offsets) - 1
+    heads = numpy.repeat(numpy.arange(n, dtype=numpy.int64),
+                         numpy.diff(numpy.asarray(offsets, dtype=numpy.int64)))
+    tails = numpy.asarray(targets, dtype=numpy.int64)
+    weights = numpy.asarray(weights, dtype=numpy.float64)
+    distance = numpy.asarray(distance, dtype=numpy.float64)
+    predecessor = numpy.asarray(predecessor, dtype=numpy.int64)
+    passes = 0
+    while True:
+        candidate = distance[heads] + weights
+        better = candidate < distance[tails]
+        if not better.any():
+            return array('d', distance.tobytes()), \
+                array('q', predecessor.tobytes()), None
+        passes += 1
+        head, tail, candidate = heads[better], tails[better], candidate[better]
+        numpy.minimum.at(distance, tail, candidate)
+        best = candidate == distance[tail]
+        predecessor[tail[best]] = head[best]
+        if passes >= n:         # still changing after V-1 passes
+            cycle = _predecessor_cycle(predecessor.tolist())
+            if cycle is not None:
+                return array('d', distance.tobytes()), \
+                    array('q', predecessor.tobytes()), cycle
+
+
+def _queued(offsets, targets, weights, distance, predecessor):
+    """SPFA: scan the edges of the vertices whose distance changed, in FIFO
+    order. Return (distance, predecessor, cycle).
+
+    """
+    n = len(offsets) - 1
+    length = array('q', [0]) * n    # edges of the path found to v
+    queued = bytearray(n)
+    queue = deque(v for v in range(n) if distance[v] < float('inf'))
+    for v in queue:
+        queued[v] = 1
+    while queue:
+        u = queue.popleft()
+        queued[u] = 0
+        du = distance[u]
+        for k in range(offsets[u], offsets[u+1]):
+            v = targets[k]
+            dv = du + weights[k]
+            if dv < distance[v]:
+                distance[v] = dv
+                predecessor[v] = u
+                length[v] = length[u] + 1
+                if length[v] >= n:  # the path repeats a vertex
+                    cycle = _predecessor_cycle(predecessor)
+                    if cycle is not None:
+                        return distance, predecessor, cycle
+                if not queued[v]:
+                    queued[v] = 1
+                    queue.append(v)
+    return distance, predecessor, None
+
+
+def csr_bellman_ford(offsets, targets, weights, src=None, vectorized=None):
+    """Bellman-Ford's algorithm on CSR buffers, from vertex id src, or from
+    all the vertices at distance 0 if src is None (which finds a negative
+    cycle anywhere in the graph).
+    Arg:
+        vectorized: use numpy if True (raise ImportError if it is not
+            installed), SPFA if False, numpy when it is installed if None
+    Return:
+        (distance, predecessor, cycle): arrays indexed by vertex id (-1 for
+        no predecessor), and the list of the vertex ids of a negative cycle
+        or None; the distances are not final if there is a cycle
+
+    """
+    n = len(offsets) - 1
+    if src is None:
+        distance = array('d', [0.0]) * n
+    else:
+        distance = array('d', [float('inf')]) * n
+        distance[src] = 0.0
+    predecessor = array('q', [-1]) * n
+    if vectorized is None:
+        vectorized = numpy is not None
+    elif vectorized and numpy is None:
+        raise ImportError('vectorized=True requires numpy')
+    if vectorized:
+        return _vectorized(offsets, targets, weights, distance, predecessor)
+    return _queued(offsets, targets, weights, distance, predecessor)
+
+
+def negative_cycle(graph, src=None, vectorized=None):
+    """Return the vertices of a negative cycle of the graph in the order of
+    its edges, or an empty list if there is none. Only the cycles reachable
+    from src are searched if it is given.
+
+    """
+    frozen = as_frozen(graph)
+    offsets, targets, weights = frozen.csr()
+    if src is not None:
+        src = frozen.vertex_id(src)
+    cycle = csr_bellman_ford(offsets, targets, weights, src, vectorized)[2]
+    return [frozen.vertex_by_id(v) for v in cycle or []]
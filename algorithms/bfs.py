@@ -0,0 +1,194 @@
+# Copyright (C) 2018, bruinspaw <bruinspaw@gmail.com>
+#
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Breadth-first search on the CSR buffers of large graphs
+Contents:
+    multi_source_breadth_first_search: many searches at once, sharing each
+        scan of an adjacency list between them (MS-BFS)
+    direction_optimizing_breadth_first_search: search switching between
+        top-down and bottom-up levels by the size of the frontier
+
+Vertices are identified by the integer ids of the frozen graph, and the
+distances are arrays indexed by vertex id, -1 meaning not reached.
+
+References:
+    Then, Kaufmann et al, The More the Merrier: Efficient Multi-Source
+    Graph Traversal, VLDB 2015
+    Beamer, Asanovic, Patterson, Direction-Optimizing Breadth-First
+    Search, SC 2012
+
+"""
+
+from array import array
+
+from .graph import *
+
+
+def _bits(mask):
+    """Yield the positions of the bits set in mask."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _batch_breadth_first_search(offsets, targets, sources):
+    """Breadth-first searches from a batch of vertex ids at once. Bit i of
+    the masks stands for the search from sources[i]:
+        seen[v] = searches that reached v
+        frontier = { v: searches that reached v at the current level }
+    Return the list of the distance arrays of the searches.
+
+    """
+    n = len(offsets) - 1
+    distances = [array('q', [-1]) * n for s in sources]
+    seen = [0] * n
+    frontier = {}
+    for i, s in enumerate(sources):
+        seen[s] |= 1 << i
+        frontier[s] = frontier.get(s, 0) | 1 << i
+        distances[i][s] = 0
+    level = 0
+    while frontier:
+        level += 1
+        reached = {}
+        for u, mask in frontier.items():
+            for k in range(offsets[u], offsets[u+1]):
+                v = targets[k]
+                new = mask & ~seen[v]
+                if new:
+                    seen[v] |= new
+                    reached[v] = reached.get(v, 0) | new
+        for v, mask in reached.items():
+            for i in _bits(mask):
+                distances[i][v] = level
+        frontier = reached
+    return distances
+
+
+def multi_source_breadth_first_search(graph, sources, batch=64):
+    """Breadth-first search from each of the sources, running a batch of
+    them at once: a vertex keeps a bitmask of the searches that reached it,
+    and one scan of its adjacency list advances all the searches at it.
+    Yield (source, distances) in the order of sources, the distances being
+    an array of levels indexed by vertex id (-1 if not reached).
+    Arg:
+        graph: a directed or undirected graph, or a frozen snapshot of one
+        sources: an iteration of vertices of the graph
+        batch: number of searches run at once (the width of the masks)
+
+    """
+    frozen = as_frozen(graph)
+    offsets, targets = frozen.csr()[:2]
+    sources = list(sources)
+    for first in range(0, len(sources), batch):
+        part = sources[first:first+batch]
+        ids = [frozen.vertex_id(s) for s in part]
+        for s, distance in zip(part, _batch_breadth_first_search(
+                offsets, targets, ids)):
+            yield s, distance
+
+
+def _top_down(offsets, targets, frontier, level, distance, predecessor):
+    """Scan the outgoing edges of the frontier; return the next frontier."""
+    reached = array('q')
+    for u in frontier:
+        for k in range(offsets[u], offsets[u+1]):
+            v = targets[k]
+            if distance[v] < 0:
+                distance[v] = level
+                predecessor[v] = u
+                reached.append(v)
+    return reached
+
+
+def _bottom_up(offsets, sources, frontier, level, distance, predecessor):
+    """Scan the incoming edges of the unreached vertices, each one stopping
+    at the first frontier vertex found; return the next frontier.
+
+    """
+    in_frontier = bytearray(len(distance))
+    for u in frontier:
+        in_frontier[u] = 1
+    reached = array('q')
+    for v in range(len(distance)):
+        if distance[v] < 0:
+            for k in range(offsets[v], offsets[v+1]):
+                u = sources[k]
+                if in_frontier[u]:
+                    distance[v] = level
+                    predecessor[v] = u
+                    reached.append(v)
+                    break
+    return reached
+
+
+def direction_optimizing_breadth_first_search(graph, start, alpha=14,
+                                              beta=24):
+    """Breadth-first search choosing the direction of each level. Top-down
+    levels scan the outgoing edges of the frontier; bottom-up levels scan
+    the incoming edges of the unreached vertices (the CSR buffers of
+    Digraph._incoming), which pays off when the frontier is large and most
+    of those vertices find a parent early. The frontiers are arrays of ids.
+    Arg:
+        graph: a directed or undirected graph, or a frozen snapshot of one
+        start: start vertex
+        alpha: go bottom-up when the edges out of the frontier are more
+            than 1/alpha of the edges into the unreached vertices
+        beta: go back top-down when the frontier has less than 1/beta of
+            the vertices
+    Return:
+        (distance, predecessor): arrays indexed by vertex id, -1 meaning
+        not reached (or no predecessor); the distances are those of
+        breadth_first_search, the predecessors may be other parents at
+        the previous level
+
+    """
+    frozen = as_frozen(graph)
+    offsets, targets = frozen.csr()[:2]
+    in_offsets, sources = frozen.reverse_csr()[:2]
+    n = len(offsets) - 1
+    distance = array('q', [-1]) * n
+    predecessor = array('q', [-1]) * n
+    s = frozen.vertex_id(start)
+    distance[s] = 0
+    frontier = array('q', [s])
+    unexplored = len(sources) - (in_offsets[s+1] - in_offsets[s])
+    top_down = True
+    level = 0
+    while frontier:
+        level += 1
+        if top_down:
+            scouted = sum(offsets[u+1] - offsets[u] for u in frontier)
+            top_down = scouted * alpha <= unexplored
+        else:
+            top_down = len(frontier) * beta < n
+        if top_down:
+            frontier = _top_down(offsets, targets, frontier, level,
+                                 distance, predecessor)
+        else:
+            frontier = _bottom_up(in_offsets, sources, frontier, level,
+                                  distance, predecessor)
+        unexplored -= sum(in_offsets[v+1] - in_offsets[v] for v in frontier)
+    return distance, predecessor
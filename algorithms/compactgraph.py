@@ -0,0 +1,366 @@
+# Copyright (C) 2018, bruinspaw <bruinspaw@gmail.com>
+#
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Compact graph representation with integer vertices and array-based edges"""
+
+from array import array
+
+from .graph import *
+
+
+_HUB_DEGREE = 32    # vertices with more edges get a dict index of them
+
+
+class CompactDigraph:
+    """Compact representation of a directed graph. Vertices are the integer
+    ids 0..n-1, and edges are rows of parallel arrays instead of objects:
+        self._tags = [ tag of each vertex ]
+        self._ids = { tag: id }
+        edge k goes from self._heads[k] to self._tails[k], its weight is
+        self._weights[k]
+        self._outgoing = [ array of the outgoing edge numbers of a vertex ]
+        self._incoming = [ array of the incoming edge numbers of a vertex ]
+        edge k is at position self._out_slot[k] of the outgoing array of
+        its head, and at self._in_slot[k] of the incoming array of its tail
+        self._hubs = { vertex: { adjacent vertex: edge number } } for the
+            vertices with more than _HUB_DEGREE outgoing edges
+    An edge is found by scanning the outgoing array of a low-degree vertex
+    or by the dict index of a hub, and removed from an array by moving the
+    last entry into its place.
+
+    The query interface of Digraph is provided with ids in place of Vertex
+    objects, so the algorithms in graphalgo.py run on it. Vertices cannot
+    be removed, since that would renumber them.
+
+    """
+    def __init__(self):
+        """Create an empty graph."""
+        self._tags = []
+        self._ids = {}
+        self._heads = array('i')
+        self._tails = array('i')
+        self._weights = array('d')
+        self._out_slot = array('i')
+        self._in_slot = array('i')
+        self._outgoing = []
+        self._incoming = []
+        self._hubs = {}
+
+    def __contains__(self, v):
+        """Override 'in'(membership) operator."""
+        return isinstance(v, int) and 0 <= v < len(self._tags)
+
+    __repr__ = Digraph.__repr__
+
+    def _validate_vertex(self, v):
+        """Verify that v is a vertex id of this graph."""
+        if v not in self:
+            raise ValueError('vertex not in the graph')
+
+    def _attach(self, k):
+        """Add edge number k to the adjacency arrays of its endpoints."""
+        u, v = self._heads[k], self._tails[k]
+        self._out_slot[k] = len(self._outgoing[u])
+        self._outgoing[u].append(k)
+        self._in_slot[k] = len(self._incoming[v])
+        self._incoming[v].append(k)
+        if u in self._hubs:
+            self._hubs[u][v] = k
+
+    def _take(self, edges, i, slots):
+        """Remove the entry at position i of an adjacency array, moving the
+        last entry into its place and recording its new position in slots.
+
+        """
+        last = edges.pop()
+        if i < len(edges):
+            edges[i] = last
+            slots[last] = i
+
+    def _detach(self, k):
+        """Remove edge number k from the adjacency arrays of its endpoints."""
+        u, v = self._heads[k], self._tails[k]
+        self._take(self._outgoing[u], self._out_slot[k], self._out_slot)
+        self._take(self._incoming[v], self._in_slot[k], self._in_slot)
+        if u in self._hubs:
+            del self._hubs[u][v]
+
+    def _opposite(self, k, v):
+        """Return the endpoint of edge number k that is opposite v."""
+        return self._tails[k] if self._heads[k] == v else self._heads[k]
+
+    def _find(self, u, v):
+        """Return the number of the edge from u to v, or -1 if not adjacent.
+        The index of a hub is built on its first search.
+
+        """
+        edges = self._outgoing[u]
+        if len(edges) > _HUB_DEGREE:
+            index = self._hubs.get(u)
+            if index is None:
+                index = self._hubs[u] = {self._opposite(k, u): k
+                                         for k in edges}
+            return index.get(v, -1)
+        for k in edges:
+            if self._opposite(k, u) == v:
+                return k
+        return -1
+
+    def _edge(self, k):
+        """Return edge number k as an Edge object (without tag)."""
+        return Edge(self._heads[k], self._tails[k], None, self._weights[k])
+
+    def tag(self, v):
+        """Return the tag of vertex v."""
+        self._validate_vertex(v)
+        return self._tags[v]
+
+    def vertex(self, tag):
+        """Retrieve the vertex id by tag."""
+        if tag not in self._ids:
+            raise Exception('vertex not in the graph')
+        return self._ids[tag]
+
+    def vertices_by_tags(self, tags):
+        """Retrieve a list of vertex ids by an iteration of tags."""
+        try:
+            return [self._ids[tag] for tag in tags]
+        except KeyError:
+            raise Exception('vertex not in the graph') from None
+
+    def vertex_count(self):
+        """Return the number of vertices in the graph."""
+        return len(self._tags)
+
+    def vertices(self):
+        """Return an iteration of all vertices of the graph."""
+        return range(len(self._tags))
+
+    def edge_count(self):
+        """Return the number of edges in the graph."""
+        return len(self._heads)
+
+    def edges(self):
+        """Return an iteration of all edges of the graph."""
+        return (self._edge(k) for k in range(len(self._heads)))
+
+    def edge(self, u, v):
+        """Return the edge from u to v, or None if not adjacent."""
+        self._validate_vertex(u)
+        self._validate_vertex(v)
+        k = self._find(u, v)
+        return self._edge(k) if k >= 0 else None
+
+    def out_degree(self, v):
+        """Return number of outgoing edges incident to vertex v in the graph."""
+        self._validate_vertex(v)
+        return len(self._outgoing[v])
+
+    def in_degree(self, v):
+        """Return number of incoming edges incident to vertex v in the graph."""
+        self._validate_vertex(v)
+        return len(self._incoming[v])
+
+    def predecessors(self, v):
+        """Vertices coming before a given vertex in a directed graph."""
+        self._validate_vertex(v)
+        return [self._opposite(k, v) for k in self._incoming[v]]
+
+    def successors(self, v):
+        """Vertices coming after a given vertex in a directed graph."""
+        self._validate_vertex(v)
+        return [self._opposite(k, v) for k in self._outgoing[v]]
+
+    def weighted_predecessors(self, v):
+        """Return (vertex, weight) pairs of the incoming edges of v."""
+        self._validate_vertex(v)
+        return [(self._opposite(k, v), self._weights[k])
+                for k in self._incoming[v]]
+
+    def weighted_successors(self, v):
+        """Return (vertex, weight) pairs of the outgoing edges of v."""
+        self._validate_vertex(v)
+        return [(self._opposite(k, v), self._weights[k])
+                for k in self._outgoing[v]]
+
+    def outgoing_edges(self, v):
+        """Return all outgoing edges incident to vertex v in the graph."""
+        self._validate_vertex(v)
+        return [self._edge(k) for k in self._outgoing[v]]
+
+    def incoming_edges(self, v):
+        """Return all incoming edges incident to vertex v in the graph."""
+        self._validate_vertex(v)
+        return [self._edge(k) for k in self._incoming[v]]
+
+    def insert_vertex(self, tag):
+        """Insert a vertex with the given tag and return its id. If there is
+        already a vertex with the tag, return its id.
+
+        """
+        if tag not in self._ids:
+            self._ids[tag] = len(self._tags)
+            self._tags.append(tag)
+            self._outgoing.append(array('i'))
+            self._incoming.append(array('i'))
+        return self._ids[tag]
+
+    def insert_edge(self, u, v, weight=1.0):
+        """Insert an edge from vertex u to v and return its number. If the
+        vertices are adjacent, the weight of the edge is replaced.
+
+        """
+        self._validate_vertex(u)
+        self._validate_vertex(v)
+        k = self._find(u, v)
+        if k >= 0:
+            self._weights[k] = weight
+            return k
+        k = len(self._heads)
+        self._heads.append(u)
+        self._tails.append(v)
+        self._weights.append(weight)
+        self._out_slot.append(0)
+        self._in_slot.append(0)
+        self._attach(k)
+        return k
+
+    def remove_edge(self, u, v):
+        """Remove and return an edge from u to v. If not adjacent,
+        do nothing.
+
+        """
+        self._validate_vertex(u)
+        self._validate_vertex(v)
+        k = self._find(u, v)
+        if k < 0:
+            return None
+        e = self._edge(k)
+        self._detach(k)
+        last = len(self._heads) - 1
+        if k != last:               # move the last edge into the hole
+            self._detach(last)
+            self._heads[k] = self._heads[last]
+            self._tails[k] = self._tails[last]
+            self._weights[k] = self._weights[last]
+            self._attach(k)
+        self._heads.pop()
+        self._tails.pop()
+        self._weights.pop()
+        self._out_slot.pop()
+        self._in_slot.pop()
+        return e
+
+    def reverse(self):
+        """Reverse the graph."""
+        self._outgoing, self._incoming = self._incoming, self._outgoing
+        self._heads, self._tails = self._tails, self._heads
+        self._out_slot, self._in_slot = self._in_slot, self._out_slot
+        self._hubs = {}
+
+
+class CompactGraph(CompactDigraph):
+    """Compact representation of an undirected graph. Each edge is stored
+    once and listed in the adjacency arrays of both endpoints;
+    self._incoming is identical to self._outgoing, and a self-loop is
+    listed once, at the same slot for both ends.
+
+    """
+    def __init__(self):
+        """Create an empty graph."""
+        CompactDigraph.__init__(self)
+        self._incoming = self._outgoing
+
+    def _attach(self, k):
+        """Add edge number k to the adjacency arrays of both endpoints."""
+        u, v = self._heads[k], self._tails[k]
+        self._out_slot[k] = len(self._outgoing[u])
+        self._outgoing[u].append(k)
+        if u != v:
+            self._in_slot[k] = len(self._outgoing[v])
+            self._outgoing[v].append(k)
+        else:
+            self._in_slot[k] = self._out_slot[k]
+        if u in self._hubs:
+            self._hubs[u][v] = k
+        if v in self._hubs:
+            self._hubs[v][u] = k
+
+    def _take_at(self, x, i):
+        """Remove the entry at position i of the adjacency array of x, moving
+        the last entry into its place.
+
+        """
+        edges = self._outgoing[x]
+        last = edges.pop()
+        if i < len(edges):
+            edges[i] = last
+            if self._heads[last] == x:
+                self._out_slot[last] = i
+            if self._tails[last] == x:
+                self._in_slot[last] = i
+
+    def _detach(self, k):
+        """Remove edge number k from the adjacency arrays of both endpoints."""
+        u, v = self._heads[k], self._tails[k]
+        self._take_at(u, self._out_slot[k])
+        if u != v:
+            self._take_at(v, self._in_slot[k])
+        if u in self._hubs:
+            del self._hubs[u][v]
+        if v in self._hubs:
+            self._hubs[v].pop(u, None)      # already gone for a self-loop
+
+    def insert_vertex(self, tag):
+        """Insert a vertex with the given tag and return its id."""
+        if tag not in self._ids:
+            self._ids[tag] = len(self._tags)
+            self._tags.append(tag)
+            self._outgoing.append(array('i'))
+        return self._ids[tag]
+
+
+def compact_graph_read(filename):
+    """Read graph description file (see graph_read) into a CompactDigraph
+    or a CompactGraph. Edge tags are dropped.
+
+    """
+    with open(filename, 'r') as f:
+        token = f.readline().strip()
+        if token == 'digraph':
+            graph = CompactDigraph()
+        elif token == 'graph':
+            graph = CompactGraph()
+        else:
+            raise ValueError('unknown graph type: {0}'.format(token))
+        for line in f:
+            # format: edge_tag1 vertex_tag1 vertex_tag2 [optional_weight]
+            token = line.split()
+            if not token:
+                continue
+            u = graph.insert_vertex(token[1])
+            v = graph.insert_vertex(token[2])
+            w = float(token[3]) if len(token) == 4 else 1.0
+            graph.insert_edge(u, v, w)
+    return graph
@@ -0,0 +1,129 @@
+# Copyright (C) 2018, bruinspaw <bruinspaw@gmail.com>
+#
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Strongly connected components in one pass
+Tarjan's algorithm, made iterative with an explicit stack of (vertex, next
+edge) pairs, runs once over the CSR buffers of the graph, which is left
+untouched. Vertices are identified by the integer ids of the frozen graph.
+
+References:
+    Tarjan, Depth-First Search and Linear Graph Algorithms, SIAM Journal on
+    Computing 1, 1972
+
+"""
+
+from array import array
+
+from .graph import *
+
+
+def strongly_connected_components(graph):
+    """Tarjan's algorithm. A vertex gets the next index when discovered, and
+    low is the smallest index reachable from its subtree through vertices
+    still on the stack; a vertex whose low is its own index is the root of
+    a component, made of the vertices above it on the stack.
+    Return:
+        (component, count): the array of the component id of each vertex
+        id, and the number of components; the ids are numbered in
+        topological order of the condensation, so every edge between two
+        components goes to a higher id
+
+    """
+    frozen = as_frozen(graph)
+    offsets, targets = frozen.csr()[:2]
+    n = len(offsets) - 1
+    index = array('q', [-1]) * n
+    low = array('q', [0]) * n
+    on_stack = bytearray(n)
+    component = array('q', [-1]) * n
+    stack = []
+    counter = count = 0
+    for root in range(n):
+        if index[root] >= 0:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        path = [(root, offsets[root])]
+        while path:
+            v, k = path[-1]
+            end = offsets[v+1]
+            while k < end:
+                w = targets[k]
+                k += 1
+                if index[w] < 0:            # tree edge, go down
+                    path[-1] = (v, k)
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = 1
+                    path.append((w, offsets[w]))
+                    break
+                elif on_stack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+            else:                           # all edges done, go up
+                path.pop()
+                if low[v] == index[v]:      # root of a component
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = 0
+                        component[w] = count
+                        if w == v:
+                            break
+                    count += 1
+                if path:
+                    u = path[-1][0]
+                    if low[v] < low[u]:
+                        low[u] = low[v]
+    # components are completed in reverse topological order
+    for v in range(n):
+        component[v] = count - 1 - component[v]
+    return component, count
+
+
+def condensation(graph, component=None):
+    """Return the condensation of the graph as a new Digraph: a vertex
+    tagged with each component id, and an edge (i, j) if an edge of the
+    graph goes from component i to component j, weighted with the smallest
+    such weight. The component array is computed if not given.
+
+    """
+    frozen = as_frozen(graph)
+    if component is None:
+        component = strongly_connected_components(frozen)[0]
+    offsets, targets, weights = frozen.csr()
+    count = max(component) + 1 if len(component) else 0
+    dag = Digraph()
+    vertices = [dag.insert_vertex(Vertex(i)) for i in range(count)]
+    lightest = {}
+    for v in range(len(offsets) - 1):
+        for k in range(offsets[v], offsets[v+1]):
+            pair = (component[v], component[targets[k]])
+            if pair[0] != pair[1] and weights[k] < lightest.get(
+                    pair, float('inf')):
+                lightest[pair] = weights[k]
+    dag.insert_edges(Edge(vertices[i], vertices[j], None, w)
+                     for (i, j), w in lightest.items())
+    return dag
@@ -0,0 +1,299 @@
+# Copyright (C) 2018, bruinspaw <bruinspaw@gmail.com>
+#
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Contraction hierarchies
+Vertices are contracted one by one, from the least to the most important.
+Contracting v removes it from the remaining graph and adds a shortcut
+(u, w) for each path u -> v -> w that is the only shortest path between u
+and w (no witness path avoiding v is found). A shortest path then always
+exists that goes up in the order and then down, so a query is a
+bidirectional search over the upward edges from the source and the
+downward edges into the target. Edge weights must be non-negative.
+
+References:
+    Geisberger, Sanders, Schultes, Delling, Contraction Hierarchies: Faster
+    and Simpler Hierarchical Routing in Road Networks, WEA 2008
+
+"""
+
+import heapq
+from array import array
+from struct import Struct
+
+from .graphfile import (byte_order_flags, check_byte_order, graph_fingerprint,
+                        tag_table, tagged_vertices)
+
+
+_MAGIC = b'CHY2'
+_HEADER = Struct('<4sIQQQQQ')   # magic, flags, fingerprint, vertices, up,
+                                # down, text
+
+
+class ContractionHierarchy:
+    """Contraction hierarchy of a graph, vertices being numbered in the order
+    of graph.vertices():
+        self._rank[i] = position of vertex i in the contraction order
+        self._up[i] = [ (j, weight) for edges i -> j with a higher rank j ]
+        self._down[i] = [ (j, weight) for edges j -> i with a higher rank j ]
+        self._middle = { (i, j): the vertex a shortcut i -> j bypasses }
+        self._fingerprint = fingerprint of the edges of the graph, see
+            graph_fingerprint()
+
+    """
+    def __init__(self, graph, witness_limit=50):
+        """Build the hierarchy. Witness searches give up after settling
+        witness_limit vertices, adding the shortcut in doubt.
+
+        """
+        self._vertices = list(graph.vertices())
+        self._index = {v: i for i, v in enumerate(self._vertices)}
+        self._fingerprint = graph_fingerprint(graph, self._vertices)
+        n = len(self._vertices)
+        self._rank = array('q', [-1]) * n
+        self._up = [[] for i in range(n)]
+        self._down = [[] for i in range(n)]
+        self._middle = {}
+        self._witness_limit = witness_limit
+        # remaining graph, keeping the lightest of parallel edges
+        self._out = [{} for i in range(n)]
+        self._in = [{} for i in range(n)]
+        for u in self._vertices:
+            i = self._index[u]
+            for v, w in graph.weighted_successors(u):
+                j = self._index[v]
+                if i != j and w < self._out[i].get(j, float('inf')):
+                    self._out[i][j] = w
+                    self._in[j][i] = w
+        self._contract_all()
+        del self._out, self._in
+
+    def _witness(self, source, skip, limit):
+        """Distances from source in the remaining graph without vertex skip,
+        up to limit (searching at most witness_limit vertices).
+
+        """
+        distance = {source: 0}
+        heap = [(0, source)]
+        settled = 0
+        while heap and settled < self._witness_limit:
+            d, u = heapq.heappop(heap)
+            if d > distance[u]:
+                continue
+            if d > limit:
+                break
+            settled += 1
+            for v, w in self._out[u].items():
+                if v != skip and d + w < distance.get(v, float('inf')):
+                    distance[v] = d + w
+                    heapq.heappush(heap, (d + w, v))
+        return distance
+
+    def _shortcuts(self, v):
+        """Return the (u, w, weight) shortcuts needed to contract v."""
+        shortcuts = []
+        targets = self._out[v]
+        if not targets:
+            return shortcuts
+        farthest = max(targets.values())
+        for u, wu in self._in[v].items():
+            distance = self._witness(u, v, wu + farthest)
+            for w, ww in targets.items():
+                if w != u and distance.get(w, float('inf')) > wu + ww:
+                    shortcuts.append((u, w, wu + ww))
+        return shortcuts
+
+    def _priority(self, v, deleted):
+        """Importance of v: edge difference plus contracted neighbors."""
+        shortcuts = self._shortcuts(v)
+        removed = len(self._out[v]) + len(self._in[v])
+        return len(shortcuts) - removed + 2 * deleted[v], shortcuts
+
+    def _contract_all(self):
+        """Contract the vertices in the order of the lazily updated
+        priorities.
+
+        """
+        n = len(self._vertices)
+        deleted = [0] * n
+        heap = [(self._priority(v, deleted)[0], v) for v in range(n)]
+        heapq.heapify(heap)
+        order = 0
+        while heap:
+            p, v = heapq.heappop(heap)
+            p, shortcuts = self._priority(v, deleted)
+            if heap and p > heap[0][0]:     # outdated priority
+                heapq.heappush(heap, (p, v))
+                continue
+            for u, w, weight in shortcuts:
+                if weight < self._out[u].get(w, float('inf')):
+                    self._out[u][w] = weight
+                    self._in[w][u] = weight
+                    self._middle[(u, w)] = v
+            self._rank[v] = order
+            order += 1
+            self._up[v] = list(self._out[v].items())
+            self._down[v] = list(self._in[v].items())
+            for w in self._out[v]:
+                del self._in[w][v]
+                deleted[w] += 1
+            for u in self._in[v]:
+                del self._out[u][v]
+                deleted[u] += 1
+            self._out[v], self._in[v] = {}, {}
+
+    def _unpack(self, u, w, path):
+        """Append the original vertices of edge u -> w (without u) to path."""
+        v = self._middle.get((u, w))
+        if v is None:
+            path.append(w)
+        else:
+            self._unpack(u, v, path)
+            self._unpack(v, w, path)
+
+    def query(self, src, dst):
+        """Shortest path from src to dst by a bidirectional upward search.
+        Return:
+            (path, distance), or ([], inf) if dst cannot be reached
+
+        """
+        inf = float('inf')
+        s, t = self._index[src], self._index[dst]
+        distance = ({s: 0}, {t: 0})
+        predecessor = ({s: None}, {t: None})
+        heaps = ([(0, s)], [(0, t)])
+        edges = (self._up, self._down)
+        best, middle = (0, s) if s == t else (inf, None)
+        while heaps[0] or heaps[1]:
+            side = 0 if heaps[0] and (not heaps[1] or
+                                      heaps[0][0] <= heaps[1][0]) else 1
+            d, u = heapq.heappop(heaps[side])
+            if d >= best:           # this direction cannot improve
+                heaps[side].clear()
+                continue
+            labels = distance[side]
+            if d > labels[u]:       # outdated entry
+                continue
+            other = distance[1 - side].get(u)
+            if other is not None and d + other < best:
+                best, middle = d + other, u
+            for v, w in edges[side][u]:
+                if d + w < labels.get(v, inf):
+                    labels[v] = d + w
+                    predecessor[side][v] = u
+                    heapq.heappush(heaps[side], (d + w, v))
+        if middle is None:
+            return [], inf
+        up = [middle]
+        while predecessor[0][up[-1]] is not None:
+            up.append(predecessor[0][up[-1]])
+        up.reverse()
+        down = [middle]
+        while predecessor[1][down[-1]] is not None:
+            down.append(predecessor[1][down[-1]])
+        hops = up + down[1:]
+        path = [hops[0]]
+        for u, w in zip(hops, hops[1:]):
+            self._unpack(u, w, path)
+        return [self._vertices[i] for i in path], best
+
+    def save(self, filename):
+        """Write the hierarchy to a file. The vertices are stored by the text
+        of their tags, so the graph must be made of Vertex objects with
+        unique tags. The fingerprint of the edges is stored to check the
+        graph on loading.
+
+        """
+        offsets, text = tag_table(self._vertices)
+        sections = [self._rank, offsets]
+        counts = []
+        for edges in (self._up, self._down):
+            rows = array('q', [0])
+            targets, weights, middles = array('q'), array('d'), array('q')
+            for i, row in enumerate(edges):
+                for j, w in row:
+                    targets.append(j)
+                    weights.append(w)
+                    key = (i, j) if edges is self._up else (j, i)
+                    middles.append(self._middle.get(key, -1))
+                rows.append(len(targets))
+            sections += [rows, targets, weights, middles]
+            counts.append(len(targets))
+        with open(filename, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, byte_order_flags(), self._fingerprint,
+                                 len(self._vertices), counts[0], counts[1],
+                                 len(text)))
+            for section in sections:
+                section.tofile(f)
+            f.write(text)
+
+    @classmethod
+    def load(cls, graph, filename):
+        """Read a hierarchy written by save(), matching the vertices of the
+        graph by tag. Raise ValueError if the file was written for another
+        graph (other tags or edges) or in another byte order.
+
+        """
+        def read(f, typecode, count):
+            section = array(typecode)
+            section.fromfile(f, count)
+            return section
+
+        with open(filename, 'rb') as f:
+            magic, flags, fingerprint, n, m_up, m_down, size = _HEADER.unpack(
+                f.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError('not a hierarchy file: {0}'.format(filename))
+            check_byte_order(flags)
+            rank = read(f, 'q', n)
+            offsets = read(f, 'q', n + 1)
+            csr = [(read(f, 'q', n + 1), read(f, 'q', m), read(f, 'd', m),
+                    read(f, 'q', m)) for m in (m_up, m_down)]
+            text = f.read(size)
+        hierarchy = cls.__new__(cls)
+        hierarchy._vertices = tagged_vertices(graph, offsets, text)
+        if graph_fingerprint(graph, hierarchy._vertices) != fingerprint:
+            raise ValueError('hierarchy file does not match the graph')
+        hierarchy._fingerprint = fingerprint
+        hierarchy._index = {v: i for i, v in enumerate(hierarchy._vertices)}
+        hierarchy._rank = rank
+        hierarchy._middle = {}
+        edges = []
+        for direction, (rows, targets, weights, middles) in enumerate(csr):
+            lists = []
+            for i in range(n):
+                row = []
+                for k in range(rows[i], rows[i+1]):
+                    row.append((targets[k], weights[k]))
+                    if middles[k] >= 0:
+                        key = (i, targets[k]) if direction == 0 \
+                            else (targets[k], i)
+                        hierarchy._middle[key] = middles[k]
+                lists.append(row)
+            edges.append(lists)
+        hierarchy._up, hierarchy._down = edges
+        return hierarchy
+
+    def shortcut_count(self):
+        """Return the number of shortcuts in the hierarchy."""
+        return len(self._middle)
@@ -0,0 +1,198 @@
+# Copyright (C) 2018, bruinspaw <bruinspaw@gmail.com>
+#
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Dynamic single source shortest paths
+A shortest-path tree is kept up to date while edges are inserted, removed
+or change weight, repairing only the part of the tree the change affects:
+    - a shorter edge (u, v) improves v and then the vertices reached from
+      it, as a Dijkstra search seeded with v
+    - a longer or removed tree edge (u, v) detaches the subtree of v; each
+      of its vertices takes the best edge from outside the subtree, and a
+      Dijkstra search seeded with them settles the subtree again
+    - a change of a non-tree edge that does not shorten a path does nothing
+Edge weights must be non-negative.
+
+References:
+    Ramalingam, Reps, An Incremental Algorithm for a Generalization of the
+    Shortest-Path Problem, Journal of Algorithms 21, 1996
+
+"""
+
+import heapq
+from itertools import count
+
+from .graph import *
+from .graphalgo import *
+
+
+class DynamicShortestPaths:
+    """Shortest paths from a source, repaired after each change of the
+    graph made through this object:
+        self.distance = { v: distance from the source }
+        self.predecessor = { v: parent of v in the shortest-path tree }
+        self._children = { v: set of the children of v in the tree }
+    self.affected is the number of vertices settled again by the last
+    change.
+
+    """
+    def __init__(self, graph, src, state=None):
+        """Take the search state of dijkstra(graph, src), which is computed
+        if not given, and keep it up to date from now on.
+
+        """
+        if state is None:
+            state = dijkstra(graph, src)
+        self._graph = graph
+        self._src = src
+        self._undirected = isinstance(graph, Graph)
+        self.state = state
+        self.distance = state.distance
+        self.predecessor = state.predecessor
+        self._children = {v: set() for v in graph.vertices()}
+        for v, u in self.predecessor.items():
+            if u is not None:
+                self._children[u].add(v)
+        self.affected = 0
+
+    def _add_vertex(self, v):
+        """Start tracking a new, unreached vertex."""
+        if v not in self._children:
+            self.distance[v] = float('inf')
+            self.predecessor[v] = None
+            self._children[v] = set()
+            self.state.color[v] = 'white'
+            self.state.discover[v] = self.state.finish[v] = 0
+
+    def _set_parent(self, v, u):
+        """Make u the parent of v in the tree (None for no parent)."""
+        old = self.predecessor[v]
+        if old is not None:
+            self._children[old].discard(v)
+        self.predecessor[v] = u
+        if u is not None:
+            self._children[u].add(v)
+
+    def _propagate(self, seeds):
+        """Dijkstra's algorithm from the seeds, at their current distances,
+        improving the vertices reached from them.
+
+        """
+        distance = self.distance
+        tie = count()
+        heap = [(distance[v], next(tie), v) for v in seeds]
+        heapq.heapify(heap)
+        while heap:
+            d, i, u = heapq.heappop(heap)
+            if d > distance[u]:         # outdated entry
+                continue
+            self.affected += 1
+            for v, w in self._graph.weighted_successors(u):
+                if d + w < distance[v]:
+                    distance[v] = d + w
+                    self._set_parent(v, u)
+                    heapq.heappush(heap, (d + w, next(tie), v))
+
+    def _shortened(self, u, v, w):
+        """Repair the tree after edge (u, v) got the smaller weight w."""
+        if self.distance[u] + w < self.distance[v]:
+            self.distance[v] = self.distance[u] + w
+            self._set_parent(v, u)
+            self._propagate([v])
+
+    def _lengthened(self, u, v):
+        """Repair the tree after edge (u, v) got longer or was removed."""
+        if self.predecessor[v] is not u:    # not a tree edge
+            return
+        subtree = [v]
+        for x in subtree:
+            subtree.extend(self._children[x])
+        detached = set(subtree)
+        for x in subtree:
+            self.distance[x] = float('inf')
+        seeds = []
+        for x in subtree:
+            best, parent = float('inf'), None
+            for p, w in self._graph.weighted_predecessors(x):
+                if p not in detached and self.distance[p] + w < best:
+                    best, parent = self.distance[p] + w, p
+            self.distance[x] = best
+            self._set_parent(x, parent)
+            if parent is not None:
+                seeds.append(x)
+        self._propagate(seeds)
+
+    def _changed(self, u, v, old, new):
+        """Repair the tree after the weight of (u, v) went from old to new,
+        None meaning no edge.
+
+        """
+        self.affected = 0
+        pairs = [(u, v), (v, u)] if self._undirected else [(u, v)]
+        for a, b in pairs:
+            if old is None or (new is not None and new < old):
+                self._shortened(a, b, new)
+            elif new is None or new > old:
+                self._lengthened(a, b)
+
+    def insert_edge(self, e):
+        """Insert edge e into the graph (adding its endpoints if needed, and
+        replacing an edge between them) and repair the tree.
+
+        """
+        u, v = e.endpoints()
+        for x in (u, v):
+            if x not in self._graph:
+                self._graph.insert_vertex(x)
+            self._add_vertex(x)
+        old = self._graph.edge(u, v)
+        old = None if old is None else old.distance
+        self._graph.insert_edge(e)
+        self._changed(u, v, old, e.distance)
+        return e
+
+    def remove_edge(self, u, v):
+        """Remove the edge from u to v from the graph, repair the tree and
+        return the edge (None if not adjacent).
+
+        """
+        e = self._graph.remove_edge(u, v)
+        if e is not None:
+            self._changed(u, v, e.distance, None)
+        return e
+
+    def update_weight(self, u, v, distance):
+        """Set the weight of the edge from u to v and repair the tree."""
+        e = self._graph.edge(u, v)
+        old = None if e is None else e.distance
+        e = self._graph.update_weight(u, v, distance)
+        self._changed(u, v, old, distance)
+        return e
+
+    def path(self, dst):
+        """Return (path, distance) from the source to dst, or ([], inf) if
+        dst cannot be reached.
+
+        """
+        return (construct_path(self._src, dst, self.predecessor),
+                self.distance[dst])
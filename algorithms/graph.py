@@ -22,13 +22,23 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+from array import array
+from bisect import bisect_left
+import time
+
 
 class Vertex:
     """Lightweight vertex structure for a graph. If the vertex object is used in a
     priority queue (such as Dijkstra's algorithm, you should subclass this class and
     implement operator '__lt__'.
 
+    The attributes other than the tag are only set by the graph algorithms in
+    compatibility mode. Vertices compare and hash by identity (the defaults of
+    object), which allows a vertex to be a map/set key.
+
     """
+    __slots__ = '_tag', 'color', 'predecessor', 'distance', 'discover', 'finish'
+
     def __init__(self, tag):
         """Initialize a vertex with a tag."""
         self._tag = tag
@@ -42,12 +52,6 @@ class Vertex:
         """Vertex comparison, usually used in priority queue."""
         return self.distance < other.distance
 
-    def __hash__(self):  # will allow vertex to be a map/set key
-        return hash(id(self))
-
-    def __eq__(self, other):
-        return self is other
-
     def __repr__(self):
         return str(self._tag)
 
@@ -89,7 +93,7 @@ class Edge:
         return hash((self._head, self._tail))
 
     def __eq__(self, other):
-        return self._head is other._head and self._tail is other._tail
+        return self._head == other._head and self._tail == other._tail
 
     def __repr__(self):
         return '{0} ({1}, {2})'.format(self._tag, self._head, self._tail)
@@ -101,11 +105,23 @@ class Digraph:
                            for u in graph.vertices }
         self._incoming = { u: { v: edge for edge(v, u) in graph.edges}
                            for u in graph.vertices }
+    Vertices are also indexed by tag, tags are expected to be unique, and
+    the edges are collected as they are inserted and removed:
+        self._tags = { v._tag: v for v in graph.vertices }
+        self._edges = { id(edge): edge for edge in graph.edges }
+    Every change of the graph bumps a version counter, so results computed
+    on the graph can be checked for staleness:
+        self._version = number of changes since the graph was created
+    Weights changed by assigning edge.distance directly are not counted,
+    use update_weight() instead.
     """
     def __init__(self):
         """Create an empty graph (undirected, by default)."""
         self._outgoing = {}
         self._incoming = {}
+        self._tags = {}
+        self._edges = {}
+        self._version = 0
 
     def __contains__(self, v):
         """Override 'in'(membership) operator."""
@@ -141,10 +157,20 @@ class Digraph:
 
     def vertex(self, tag):
         """Retrieve the vertex by tag."""
-        for v in self.vertices():
-            if v._tag == tag:
-                return v
-        raise Exception('vertex not in the graph')
+        if tag not in self._tags:
+            raise Exception('vertex not in the graph')
+        return self._tags[tag]
+
+    def vertices_by_tags(self, tags):
+        """Retrieve a list of vertices by an iteration of tags."""
+        try:
+            return [self._tags[tag] for tag in tags]
+        except KeyError:
+            raise Exception('vertex not in the graph') from None
+
+    def version(self):
+        """Return the version counter, bumped by every change of the graph."""
+        return self._version
 
     def vertex_count(self):
         """Return the number of vertices in the graph."""
@@ -156,15 +182,11 @@ class Digraph:
 
     def edge_count(self):
         """Return the number of edges in the graph."""
-        total = sum(len(self._outgoing[v]) for v in self._outgoing)
-        return total
+        return len(self._edges)
 
     def edges(self):
-        """Return an iteration of all edges of the graph."""
-        result = set()  # avoid double-reporting edges of undirected graph
-        for secondary_map in self._outgoing.values():
-            result.update(secondary_map.values())  # add edges to result
-        return result
+        """Return an iteration (a live view) of all edges of the graph."""
+        return self._edges.values()
 
     def edge(self, u, v):
         """Return the edge from u to v, or None if not adjacent."""
@@ -195,6 +217,16 @@ class Digraph:
         self._validate_vertex(v)
         return self._outgoing[v]
 
+    def weighted_predecessors(self, v):
+        """Return (vertex, weight) pairs of the incoming edges of v."""
+        self._validate_vertex(v)
+        return [(u, e.distance) for u, e in self._incoming[v].items()]
+
+    def weighted_successors(self, v):
+        """Return (vertex, weight) pairs of the outgoing edges of v."""
+        self._validate_vertex(v)
+        return [(u, e.distance) for u, e in self._outgoing[v].items()]
+
     def outgoing_edges(self, v):
         """Return all outgoing edges incident to vertex v in the graph."""
         self._validate_vertex(v)
@@ -210,17 +242,35 @@ class Digraph:
         if v not in self:
             self._outgoing[v] = {}
             self._incoming[v] = {}
+            self._tags.setdefault(v._tag, v)
+            self._version += 1
         return v
 
     def remove_vertex(self, v):
-        """Remove a vertex."""
+        """Remove a vertex and its incident edges."""
         self._validate_vertex(v)
-        for u in self.vertices():
-            # if not adjacent, do nothing
-            self.remove_edge(u, v)
-            self.remove_edge(v, u)
+        self._remove_vertex(v)
+
+    def _remove_vertex(self, v):
+        """Remove vertex v of the graph, touching only its incident edges."""
+        for u, e in self._outgoing[v].items():
+            self._incoming[u].pop(v, None)
+            self._edges.pop(id(e), None)
+        for u, e in self._incoming[v].items():
+            self._outgoing[u].pop(v, None)
+            self._edges.pop(id(e), None)  # already gone for a self-loop
         self._incoming.pop(v)
         self._outgoing.pop(v)
+        if self._tags.get(v._tag) is v:
+            self._tags.pop(v._tag)
+        self._version += 1
+
+    def remove_vertices(self, vertices):
+        """Remove an iteration of vertices and their incident edges."""
+        for v in vertices:
+            if v not in self._outgoing:
+                raise ValueError('vertex not in the graph')
+            self._remove_vertex(v)
 
     def insert_edge(self, e):
         """Insert and return an edge. If the endpoints of the edge are not
@@ -232,24 +282,76 @@ class Digraph:
             self.insert_vertex(u)
         if v not in self:
             self.insert_vertex(v)
+        self._link(u, v, e)
+        return e
+
+    def insert_edges(self, edges):
+        """Insert an iteration of edges, adding their endpoints to the graph
+        if needed. The endpoints are expected to be Vertex objects.
+
+        """
+        for e in edges:
+            u, v = e._head, e._tail
+            if u not in self._outgoing:
+                self.insert_vertex(u)
+            if v not in self._outgoing:
+                self.insert_vertex(v)
+            self._link(u, v, e)
+
+    def _link(self, u, v, e):
+        """Store edge e from u to v, both vertices must be in the graph."""
+        old = self._outgoing[u].get(v)
+        if old is not None:         # replaced
+            self._edges.pop(id(old))
         self._outgoing[u][v] = e
         self._incoming[v][u] = e
-        return e
+        self._edges[id(e)] = e
+        self._version += 1
 
     def remove_edge(self, u, v):
         """Remove and return an edge from u to v. If not adjacent,
         do nothing.
 
         """
-        e = self.edge(u, v)
+        self._validate_vertex(u)
+        self._validate_vertex(v)
+        return self._unlink(u, v)
+
+    def remove_edges(self, pairs):
+        """Remove the edges of an iteration of (u, v) pairs. Pairs that are
+        not adjacent, or not in the graph, are ignored.
+
+        """
+        for u, v in pairs:
+            if u in self._outgoing and v in self._outgoing[u]:
+                self._unlink(u, v)
+
+    def _unlink(self, u, v):
+        """Remove and return the edge from u to v, or None if not adjacent."""
+        e = self._outgoing[u].pop(v, None)
         if e:
-            self._outgoing[u].pop(v)
             self._incoming[v].pop(u)
+            self._edges.pop(id(e))
+            self._version += 1
+        return e
+
+    def update_weight(self, u, v, distance):
+        """Set the weight of the edge from u to v, and return the edge."""
+        e = self.edge(u, v)
+        if e is None:
+            raise ValueError('vertices are not adjacent')
+        e.distance = distance
+        self._version += 1
         return e
 
     def reverse(self):
         """Reverse the graph."""
         self._outgoing, self._incoming = self._incoming, self._outgoing
+        self._version += 1
+
+    def freeze(self):
+        """Return a read-only CSR snapshot of the graph."""
+        return FrozenDigraph(self)
 
 
 class Graph(Digraph):
@@ -258,29 +360,287 @@ class Graph(Digraph):
 
     """
 
-    def insert_edge(self, e):
-        """Insert and return an edge. If the endpoints of the edge are not
-        vertices of the graph, then add them to the graph.
-
-        """
-        u, v = e.endpoints()
-        if u not in self:
-            self.insert_vertex(u)
-        if v not in self:
-            self.insert_vertex(v)
+    def _link(self, u, v, e):
+        """Store edge e between u and v, both vertices must be in the graph."""
+        old = self._outgoing[u].get(v)
+        if old is not None:         # replaced
+            self._edges.pop(id(old))
         self._outgoing[u][v] = e     # add (u, v)
         self._incoming[v][u] = e
         self._outgoing[v][u] = e     # add (v, u)
         self._incoming[u][v] = e
+        self._edges[id(e)] = e
+        self._version += 1
+
+    def _unlink(self, u, v):
+        """Remove and return the edge between u and v, or None if not
+        adjacent.
+
+        """
+        e = self._outgoing[u].pop(v, None)
+        if e:
+            self._incoming[v].pop(u)
+            self._outgoing[v].pop(u, None)  # already gone for a self-loop
+            self._incoming[u].pop(v, None)
+            self._edges.pop(id(e))
+            self._version += 1
         return e
 
-    def remove_edge(self, u, v):
-        """Remove and return an edge, if not adjacent, do nothing."""
-        Digraph.remove_edge(self, u, v)
-        return Digraph.remove_edge(self, v, u)
+    def freeze(self):
+        """Return a read-only CSR snapshot of the graph."""
+        return FrozenGraph(self)
+
 
+def _build_csr(adjacency, index):
+    """Pack an adjacency map into (offsets, targets, weights) buffers, each
+    row in the order of the adjacency map.
 
-def graph_read(filename):
+    """
+    typecode = 'i' if len(index) < 2**31 else 'q'
+    offsets = array('q', [0])
+    targets = array(typecode)
+    weights = array('d')
+    for u in index:
+        for v, e in adjacency[u].items():
+            targets.append(index[v])
+            weights.append(e.distance)
+        offsets.append(len(targets))
+    return offsets, targets, weights
+
+
+class FrozenDigraph:
+    """Read-only snapshot of a directed graph in compressed sparse row (CSR)
+    form. Vertices are numbered 0..n-1 in the order of graph.vertices():
+        self._vertices = [ vertex for each id ]
+        self._index = { vertex: id for vertex in graph.vertices }
+        outgoing edges of vertex i: targets[offsets[i]:offsets[i+1]], with
+        the edge weights at the same positions of weights, in the order of
+        the successors of the graph
+        self._lookup = (order, keys), built on the first call of edge():
+            the edge positions of each row sorted by target id, and the
+            targets in that order
+    Incoming edges are packed in the same way. The buffers are array.array
+    objects, numpy.frombuffer() can wrap them without copying. Any other
+    indexable buffers (e.g. memoryviews over a mapped file) can be used
+    through from_csr().
+
+    The snapshot provides the query interface of Digraph, so the algorithms
+    in graphalgo.py run on it directly. Edges are rebuilt on demand as Edge
+    objects without tags. Neighbors are listed in the order of the graph,
+    so traversals of the snapshot give the same results.
+
+    """
+    def __init__(self, graph):
+        """Create a snapshot of graph, the graph is not changed."""
+        self._vertices = list(graph.vertices())
+        self._index = {v: i for i, v in enumerate(self._vertices)}
+        self._tags = dict(graph._tags)
+        self._out = _build_csr(graph._outgoing, self._index)
+        self._in = self._build_incoming(graph)
+        self._lookup = None
+        self._version = 0
+
+    def _build_incoming(self, graph):
+        return _build_csr(graph._incoming, self._index)
+
+    @classmethod
+    def from_csr(cls, vertices, outgoing, incoming=None):
+        """Create a snapshot from a vertex-id table and the (offsets, targets,
+        weights) buffers of outgoing and incoming edges. The buffers are used
+        as they are, without copying. If incoming is None, the outgoing
+        buffers are used for both directions (undirected graph).
+
+        """
+        graph = cls.__new__(cls)
+        graph._vertices = list(vertices)
+        graph._index = {v: i for i, v in enumerate(graph._vertices)}
+        graph._tags = {}
+        for v in graph._vertices:
+            graph._tags.setdefault(v._tag, v)
+        graph._out = outgoing
+        graph._in = outgoing if incoming is None else incoming
+        graph._lookup = None
+        graph._version = 0
+        return graph
+
+    def __contains__(self, v):
+        """Override 'in'(membership) operator."""
+        if not isinstance(v, Vertex):
+            raise TypeError('vertex type expected')
+        return v in self._index
+
+    __repr__ = Digraph.__repr__
+
+    def _validate_vertex(self, v):
+        """Verify that v is a Vertex of this graph."""
+        if v not in self:
+            raise ValueError('vertex not in the graph')
+
+    def _neighbors(self, csr, v):
+        """Return the vertices adjacent to v in the given CSR buffers."""
+        try:
+            i = self._index[v]
+        except KeyError:
+            raise ValueError('vertex not in the graph') from None
+        offsets = csr[0]
+        return list(map(self._vertices.__getitem__,
+                        csr[1][offsets[i]:offsets[i+1]]))
+
+    def csr(self):
+        """Return the (offsets, targets, weights) buffers of outgoing edges."""
+        return self._out
+
+    def reverse_csr(self):
+        """Return the (offsets, sources, weights) buffers of incoming edges."""
+        return self._in
+
+    def vertex_id(self, v):
+        """Return the integer id of vertex v."""
+        try:
+            return self._index[v]
+        except KeyError:
+            raise ValueError('vertex not in the graph') from None
+
+    def vertex_by_id(self, i):
+        """Return the vertex whose integer id is i."""
+        return self._vertices[i]
+
+    vertex = Digraph.vertex
+    vertices_by_tags = Digraph.vertices_by_tags
+    version = Digraph.version
+
+    def vertex_count(self):
+        """Return the number of vertices in the graph."""
+        return len(self._vertices)
+
+    def vertices(self):
+        """Return an iteration of all vertices of the graph."""
+        return self._index
+
+    def edge_count(self):
+        """Return the number of edges in the graph."""
+        return len(self._out[1])
+
+    def edges(self):
+        """Return an iteration of all edges of the graph."""
+        offsets, targets, weights = self._out
+        for i, u in enumerate(self._vertices):
+            for k in range(offsets[i], offsets[i+1]):
+                yield Edge(u, self._vertices[targets[k]], None, weights[k])
+
+    def edge(self, u, v):
+        """Return the edge from u to v, or None if not adjacent."""
+        self._validate_vertex(u)
+        self._validate_vertex(v)
+        offsets, targets, weights = self._out
+        i, j = self._index[u], self._index[v]
+        start, end = offsets[i], offsets[i+1]
+        order, keys = self._row_lookup()
+        k = bisect_left(keys, j, start, end)
+        if k < end and keys[k] == j:
+            return Edge(u, v, None, weights[order[k]])
+        return None                 # not adjacent
+
+    def _row_lookup(self):
+        """Return the (order, keys) arrays searched by edge()."""
+        if self._lookup is None:
+            offsets, targets = self._out[0], self._out[1]
+            order = array('q')
+            for i in range(len(self._vertices)):
+                order.extend(sorted(range(offsets[i], offsets[i+1]),
+                                    key=targets.__getitem__))
+            keys = array('q', map(targets.__getitem__, order))
+            self._lookup = order, keys
+        return self._lookup
+
+    def out_degree(self, v):
+        """Return number of outgoing edges incident to vertex v in the graph."""
+        i = self.vertex_id(v)
+        return self._out[0][i+1] - self._out[0][i]
+
+    def in_degree(self, v):
+        """Return number of incoming edges incident to vertex v in the graph."""
+        i = self.vertex_id(v)
+        return self._in[0][i+1] - self._in[0][i]
+
+    def predecessors(self, v):
+        """Vertices coming before a given vertex in a directed graph."""
+        return self._neighbors(self._in, v)
+
+    def successors(self, v):
+        """Vertices coming after a given vertex in a directed graph."""
+        return self._neighbors(self._out, v)
+
+    def _weighted_neighbors(self, csr, v):
+        """Return (vertex, weight) pairs adjacent to v in the CSR buffers."""
+        i = self.vertex_id(v)
+        offsets, targets, weights = csr
+        vertices = self._vertices
+        return [(vertices[targets[k]], weights[k])
+                for k in range(offsets[i], offsets[i+1])]
+
+    def weighted_predecessors(self, v):
+        """Return (vertex, weight) pairs of the incoming edges of v."""
+        return self._weighted_neighbors(self._in, v)
+
+    def weighted_successors(self, v):
+        """Return (vertex, weight) pairs of the outgoing edges of v."""
+        return self._weighted_neighbors(self._out, v)
+
+    def outgoing_edges(self, v):
+        """Return all outgoing edges incident to vertex v in the graph."""
+        offsets, targets, weights = self._out
+        i = self.vertex_id(v)
+        return [Edge(v, self._vertices[targets[k]], None, weights[k])
+                for k in range(offsets[i], offsets[i+1])]
+
+    def incoming_edges(self, v):
+        """Return all incoming edges incident to vertex v in the graph."""
+        offsets, sources, weights = self._in
+        i = self.vertex_id(v)
+        return [Edge(self._vertices[sources[k]], v, None, weights[k])
+                for k in range(offsets[i], offsets[i+1])]
+
+    def reverse(self):
+        """Reverse the graph. Only the roles of the buffers are swapped."""
+        self._out, self._in = self._in, self._out
+        self._lookup = None
+        self._version += 1
+
+
+class FrozenGraph(FrozenDigraph):
+    """Read-only CSR snapshot of an undirected graph. The incoming buffers
+    are identical to the outgoing ones and are shared.
+
+    """
+    def _build_incoming(self, graph):
+        return self._out
+
+    def edge_count(self):
+        """Return the number of edges in the graph."""
+        offsets, targets = self._out[0], self._out[1]
+        loops = sum(1 for i in range(len(self._vertices))
+                    for k in range(offsets[i], offsets[i+1]) if targets[k] == i)
+        return (len(targets) + loops) // 2
+
+    def edges(self):
+        """Return an iteration of all edges, each reported once."""
+        offsets, targets, weights = self._out
+        for i, u in enumerate(self._vertices):
+            for k in range(offsets[i], offsets[i+1]):
+                if targets[k] >= i:
+                    yield Edge(u, self._vertices[targets[k]], None, weights[k])
+
+
+def as_frozen(graph):
+    """Return a CSR snapshot of a Digraph or Graph, or the graph itself if
+    it is already a snapshot.
+
+    """
+    return graph.freeze() if isinstance(graph, Digraph) else graph
+
+
+def graph_read(filename, chunk_size=1 << 20, progress=None):
     """Read graph description file. The file example (unweighted 
     and weighted graph):
     digraph (or graph)
@@ -294,39 +654,60 @@ def graph_read(filename):
         bc b c 1
         cd c d 5
         ...
+
+    The file is streamed in chunks of about chunk_size characters, so the
+    memory used for reading does not grow with the file. Vertices are
+    created once, on first sight, and edges are stored without the checks
+    of insert_edge. If given, progress(edges, seconds) is called after each
+    chunk with the number of edges read so far and the elapsed time.
     
     """
-    graph = None
-    vertices = {}
     with open(filename, 'r') as f:
         token = f.readline().strip()
         if token == 'digraph':
             graph = Digraph()
         elif token == 'graph':
             graph = Graph()
-
-        for line in f.readlines():
-            # format: edge_tag1 vertex_tag1 vertex_tag2 [optional_weight]
-            token = line.strip().split()
-            u = token[1]
-            if u not in vertices:
-                vertices[u] = Vertex(u)
-            v = token[2]
-            if v not in vertices:
-                vertices[v] = Vertex(v)
-            w = float(token[3]) if len(token) == 4 else 1.0
-            e = Edge(vertices[u], vertices[v], token[0], w)
-            graph.insert_edge(e)
+        else:
+            raise ValueError('unknown graph type: {0}'.format(token))
+
+        vertices = graph._tags
+        count = 0
+        start = time.time()
+        for lines in iter(lambda: f.readlines(chunk_size), []):
+            for line in lines:
+                # format: edge_tag1 vertex_tag1 vertex_tag2 [optional_weight]
+                token = line.split()
+                if not token:
+                    continue
+                u = vertices.get(token[1])
+                if u is None:
+                    u = graph.insert_vertex(Vertex(token[1]))
+                v = vertices.get(token[2])
+                if v is None:
+                    v = graph.insert_vertex(Vertex(token[2]))
+                w = float(token[3]) if len(token) == 4 else 1.0
+                graph._link(u, v, Edge(u, v, token[0], w))
+                count += 1
+            if progress:
+                progress(count, time.time() - start)
     return graph
 
 
+def print_progress(edges, seconds):
+    """Progress reporter for graph_read, printing the loading throughput."""
+    rate = edges / seconds if seconds > 0 else float('inf')
+    print('.. {0} edges read in {1:.1f} s ({2:.0f} edges/s)'.format(
+        edges, seconds, rate))
+
+
 if __name__ == '__main__':
     g = graph_read('../chap14/example1.txt')
     print('>> the original digraph:')
     print(g)
     print('\n>> remove ege (b->a):')
-    g.remove_edge(Vertex('B'), Vertex('A'))
+    g.remove_edge(g.vertex('B'), g.vertex('A'))
     print(g)
     print('\n>> remove vertex (a):')
-    g.remove_vertex(Vertex('A'))
+    g.remove_vertex(g.vertex('A'))
     print(g)
@@ -24,10 +24,13 @@
 
 """Implementation of graph algorithms
 Contents:
-    Depth-first Search
+    Depth-first Search (iterative, with a stream of search events)
     Breadth-first Search
-    Bellman-Ford's algorithm
+    Topological sort (Kahn's algorithm, with wavefront levels)
+    Bellman-Ford's algorithm (with negative cycle detection)
     Dijkstra's algorithm
+    Point-to-point shortest path (one-directional and bidirectional)
+    A* search
     Prim's algorithm
 
 References:
@@ -35,186 +38,617 @@ References:
 
 """
 
+import heapq
+from itertools import count
+
 from .graph import *
+from .compactgraph import CompactDigraph
 from .queue import *
 from .pqueue import *
 from .disjointset import *
 
 
-order = 0
+class SearchState:
+    """Per-query state of a graph algorithm. The state is kept here instead of
+    in the vertices, so the graph is only read and several queries can run
+    on it at the same time:
+        self.color = { v: 'white', 'gray' or 'black' }
+        self.predecessor = { v: previous vertex in a directed path }
+        self.distance = { v: distance from the source }
+        self.discover = { v: order of discovering }
+        self.finish = { v: order of finishing }
+
+    """
+    def __init__(self, graph):
+        """Initialize the state of all vertices of the graph."""
+        vertices = graph.vertices()
+        self.color = dict.fromkeys(vertices, 'white')
+        self.predecessor = dict.fromkeys(vertices)
+        self.distance = dict.fromkeys(vertices, float('inf'))
+        self.discover = dict.fromkeys(vertices, 0)
+        self.finish = dict.fromkeys(vertices, 0)
+        self.order = 0  # clock of discovering/finishing
+
+    def annotate(self):
+        """Copy the state into the vertex attributes (compatibility mode)."""
+        for v in self.color:
+            v.color = self.color[v]
+            v.predecessor = self.predecessor[v]
+            v.distance = self.distance[v]
+            v.discover = self.discover[v]
+            v.finish = self.finish[v]
+
+
+class _Key:
+    """Entry of a priority queue, ordering a vertex by a per-query key."""
+    __slots__ = '_vertex', '_key'
+
+    def __init__(self, vertex, key):
+        self._vertex = vertex
+        self._key = key
+
+    def __lt__(self, other):
+        return self._key < other._key
+
+    def __hash__(self):
+        return hash(self._vertex)
+
+    def __eq__(self, other):
+        return self._vertex == other._vertex
 
 
 def initialize_graph_traversal(graph):
     """Initialization for graph traversal problem."""
-    global order
-    order = 0
-    for v in graph.vertices():
-        v.color = 'white'
-        v.predecessor = None
-        v.distance = float('inf')
-        v.discover = 0  # order of discovering
-        v.finish = 0  # order of finishing
+    return SearchState(graph)
 
 
-def construct_path(start, end):
+def construct_path(start, end, predecessor=None):
     """Return a list of vertices comprising the directed path from start
-    to end. Return an empty list if there is no path.
+    to end. Return an empty list if there is no path. The predecessors are
+    looked up in the map predecessor (e.g. of a search state), or in the
+    vertex attributes if it is None.
 
     """
     path = []
     v = end
-    while v:
+    while v is not None:
         path.append(v)
-        if v is start:    # found
+        if v == start:    # found
             path.reverse()
             return path
-        v = v.precedessor
+        if predecessor is None:
+            v = v.predecessor
+        else:
+            v = predecessor.get(v)
     return []             # not found
 
 
-def depth_first_search(graph, start):
-    """Depth-first search algorithm"""
-    global order
-    order += 1
-    start.discover = order
-    start.color = 'gray'
-    for v in graph.successors(start):
-        if v.color == 'white':
-            v.predecessor = start
-            depth_first_search(graph, v)  # recursively search
-    start.color = 'black'
-    order += 1
-    start.finish = order
+def _events(neighbors, roots, state):
+    """Iterative depth-first search from every white vertex of roots, in
+    the given order, following neighbors(v). The path being searched is an
+    explicit stack of (vertex, iterator of its neighbors) pairs, so the
+    depth is not limited by the recursion limit. Yield the events as they
+    happen, see depth_first_events().
+
+    """
+    color, predecessor = state.color, state.predecessor
+    discover, finish = state.discover, state.finish
+    for root in roots:
+        if color[root] != 'white':
+            continue
+        state.order += 1
+        discover[root] = state.order
+        color[root] = 'gray'
+        yield 'discover', None, root
+        stack = [(root, iter(neighbors(root)))]
+        while stack:
+            u, successors = stack[-1]
+            for v in successors:
+                if color[v] == 'white':
+                    predecessor[v] = u
+                    yield 'tree', u, v
+                    state.order += 1
+                    discover[v] = state.order
+                    color[v] = 'gray'
+                    yield 'discover', u, v
+                    stack.append((v, iter(neighbors(v))))
+                    break
+                elif color[v] == 'gray':
+                    yield 'back', u, v
+                elif discover[u] < discover[v]:
+                    yield 'forward', u, v
+                else:
+                    yield 'cross', u, v
+            else:                   # all neighbors done
+                stack.pop()
+                color[u] = 'black'
+                state.order += 1
+                finish[u] = state.order
+                yield 'finish', stack[-1][0] if stack else None, u
+
+
+def _complete_visit(neighbors, vertices, state):
+    """Depth-first search from every white vertex, in the given order."""
+    for event in _events(neighbors, vertices, state):
+        pass
+    return state
+
+
+def _finished(neighbors, vertices, state):
+    """Depth-first search from every white vertex, in the given order.
+    Return the vertices in reverse order of finishing.
+
+    """
+    order = [v for event, u, v in _events(neighbors, vertices, state)
+             if event == 'finish']
+    order.reverse()
+    return order
+
+
+def depth_first_events(graph, start=None, state=None):
+    """Depth-first search yielding its events lazily, as (event, u, v):
+        ('discover', u, v): v is discovered from its predecessor u (None
+            for the start of a search)
+        ('tree', u, v): edge (u, v) leads to the newly discovered v
+        ('back', u, v): edge (u, v) leads to an ancestor v of u (in an
+            undirected graph, also the tree edge seen from the other end)
+        ('forward', u, v), ('cross', u, v): edge (u, v) leads to a finished
+            descendant of u, or to a finished vertex of another branch
+        ('finish', u, v): all neighbors of v are done, u as for 'discover'
+    The search can be stopped at any event by not asking for more. The graph
+    must not change during the search.
+    Arg:
+        graph: a directed or undirected graph
+        start: start vertex, or None to search from every vertex in turn
+        state: search state to continue, a new one if None
+
+    """
+    if state is None:
+        state = SearchState(graph)
+    roots = graph.vertices() if start is None else [start]
+    return _events(graph.successors, roots, state)
+
 
+def depth_first_search(graph, start, state=None, annotate=False):
+    """Depth-first search algorithm. Return the search state, the vertex
+    attributes are set as well if annotate is True.
 
-def complete_depth_first_search(graph):
+    """
+    if state is None:
+        state = SearchState(graph)
+    _complete_visit(graph.successors, [start], state)
+    if annotate:
+        state.annotate()
+    return state
+
+
+def complete_depth_first_search(graph, annotate=False):
     """Depth-first search algorithm for all vertices"""
-    initialize_graph_traversal(graph)
-    for v in graph.vertices():
-        if v.color == 'white':
-            depth_first_search(graph, v)
+    state = _complete_visit(graph.successors, graph.vertices(),
+                            SearchState(graph))
+    if annotate:
+        state.annotate()
+    return state
 
 
 def toposort(graph):
     """Topological sort of a directed acyclic graph."""
-    complete_depth_first_search(graph)
-    vertices = {v.finish: v for v in graph.vertices()}
-    postorder = sorted(vertices)
-    postorder.reverse()
-    return [vertices[i] for i in postorder]
+    return _finished(graph.successors, graph.vertices(), SearchState(graph))
+
+
+def _kahn(graph):
+    """Kahn's algorithm: the vertices without predecessors are ready, and a
+    vertex becomes ready when its last predecessor is taken. The ready
+    vertices are taken in FIFO order, so their levels never decrease.
+    Yield (level, vertex) pairs, then raise ValueError if some vertices
+    never got ready (they are on or after a cycle).
+
+    """
+    indegree = {v: len(graph.predecessors(v)) for v in graph.vertices()}
+    ready = [v for v, d in indegree.items() if d == 0]
+    level = dict.fromkeys(ready, 0)
+    i = 0
+    while i < len(ready):
+        u = ready[i]
+        i += 1
+        yield level[u], u
+        for v in graph.successors(u):
+            indegree[v] -= 1
+            if indegree[v] == 0:
+                level[v] = level[u] + 1
+                ready.append(v)
+    if len(ready) < len(indegree):
+        raise ValueError('the graph has a cycle')
+
+
+def topological_order(graph):
+    """Topological sort by Kahn's algorithm, in O(V+E). Yield each vertex
+    as soon as all its predecessors have been yielded. Raise ValueError
+    after the last vertex that can be sorted if the graph has a cycle.
+
+    """
+    for level, v in _kahn(graph):
+        yield v
 
 
-def kosaraju(graph):
-    """Kosaraju's algorithm for strongly connected components."""
-    # reverse the graph
-    graph.reverse()
+def topological_levels(graph):
+    """Topological sort by Kahn's algorithm, grouped in wavefronts: level 0
+    holds the vertices without predecessors, and level i the vertices whose
+    last predecessor is at level i-1. The vertices of a level do not depend
+    on each other. Return the list of levels, each a list of vertices.
+    Raise ValueError if the graph has a cycle.
+
+    """
+    levels = []
+    for level, v in _kahn(graph):
+        if level == len(levels):
+            levels.append([])
+        levels[level].append(v)
+    return levels
+
+
+def kosaraju(graph, annotate=False):
+    """Kosaraju's algorithm for strongly connected components. Each component
+    is a tree of predecessor links in the returned state.
+
+    """
     # reverse depth-first search postorder of reversed graph
-    vertices = toposort(graph)
-    # restore the graph, run depth-first search in the order above
-    graph.reverse()
-    initialize_graph_traversal(graph)
-    for v in vertices:
-        if v.color == 'white':
-            depth_first_search(graph, v)
+    order = _finished(graph.predecessors, graph.vertices(),
+                      SearchState(graph))
+    # run depth-first search in the order above
+    state = _complete_visit(graph.successors, order, SearchState(graph))
+    if annotate:
+        state.annotate()
+    return state
 
 
-def breadth_first_search(graph, start):
+def breadth_first_search(graph, start, state=None, annotate=False):
     """Breadth-first search algorithm
     Arg:
         graph: a directed or undirected graph
         start: start vertex
-        predecessors: a dictionary stores predecessor of vertices when return
+        state: search state to continue, a new one if None
+        annotate: whether to set the vertex attributes as well
+    Return:
+        the search state, with distances and predecessors of vertices
 
     """
-    start.color = 'gray'
-    start.distance = 0
-    start.predecessor = None
+    if state is None:
+        state = SearchState(graph)
+    color, distance, predecessor = (state.color, state.distance,
+                                    state.predecessor)
+    color[start] = 'gray'
+    distance[start] = 0
+    predecessor[start] = None
     queue = Queue()
     queue.enqueue(start)
     while not queue.is_empty():
         u = queue.dequeue()
         for v in graph.successors(u):
-            if v.color == 'white':
-                v.color = 'gray'
-                v.distance = u.distance + 1
-                v.predecessor = u
+            if color[v] == 'white':
+                color[v] = 'gray'
+                distance[v] = distance[u] + 1
+                predecessor[v] = u
                 queue.enqueue(v)
-        u.color = 'black'
+        color[u] = 'black'
+    if annotate:
+        state.annotate()
+    return state
 
 
-def complete_breadth_first_search(graph):
+def complete_breadth_first_search(graph, annotate=False):
     """Breadth-first search algorithm for all vertices"""
-    initialize_graph_traversal(graph)
+    state = SearchState(graph)
     for v in graph.vertices():
-        if v.color == 'white':
-            breadth_first_search(graph, v)
+        if state.color[v] == 'white':
+            breadth_first_search(graph, v, state)
+    if annotate:
+        state.annotate()
+    return state
 
 
 def initialize_single_source(graph, src):
     """Initialization for shortest path problem."""
-    for v in graph.vertices():
-        v.distance = float('inf')
-        v.predecessor = None
-    src.distance = 0
+    state = SearchState(graph)
+    state.distance[src] = 0
+    return state
 
 
-def relax(graph, u, v):
+def relax(graph, u, v, state):
     """Relaxation for shortest path problem."""
     e = graph.edge(u, v)
     if not e:
         return
-    if v.distance > u.distance + e.distance:
-        v.distance = u.distance + e.distance
-        v.predecessor = u
+    if state.distance[v] > state.distance[u] + e.distance:
+        state.distance[v] = state.distance[u] + e.distance
+        state.predecessor[v] = u
 
 
-def bellman_ford(graph, src):
-    """Bellman-Ford's algorithm of single source shortest path."""
-    initialize_single_source(graph, src)
-    for i in range(graph.vertex_count()-1):
-        for e in graph.edges():
-            relax(graph, e._head, e._tail)
+def bellman_ford(graph, src, annotate=False):
+    """Bellman-Ford's algorithm of single source shortest path. The edges are
+    listed once, and the passes stop as soon as one changes nothing. If a
+    pass still changes a distance after V-1 of them, a negative cycle is
+    reachable from src: its vertices, in the order of the cycle, are put in
+    state.negative_cycle (empty if there is none) and the distances are not
+    final.
 
+    """
+    state = initialize_single_source(graph, src)
+    distance, predecessor = state.distance, state.predecessor
+    edges = [(e._head, e._tail, e.distance) for e in graph.edges()]
+    state.negative_cycle = []
+    changed = None
+    for i in range(graph.vertex_count()):
+        changed = None
+        for u, v, w in edges:
+            if distance[u] + w < distance[v]:
+                distance[v] = distance[u] + w
+                predecessor[v] = u
+                changed = v
+        if changed is None:
+            break
+    if changed is not None:     # still changing after V-1 passes
+        # going back V times from the last changed vertex enters the cycle
+        # of the predecessor graph
+        for i in range(graph.vertex_count()):
+            changed = predecessor[changed]
+        cycle = [changed]
+        v = predecessor[changed]
+        while v is not changed:
+            cycle.append(v)
+            v = predecessor[v]
+        cycle.reverse()
+        state.negative_cycle = cycle
+    if annotate:
+        state.annotate()
+    return state
+
+
+DIAL_MAX_WEIGHT = 255      # largest weight for the bucket queue of dijkstra
+
+
+def _max_integer_weight(graph, limit):
+    """Return the largest weight of the graph if all weights are integral
+    values from 0 to limit (ints, or floats such as those read from a graph
+    file or stored in a weight array), else None. The weight arrays of
+    frozen and compact graphs are checked directly, without building Edge
+    objects.
 
-def dijkstra(graph, src):
-    """Dijkstra's algorithm of single source shortest path."""
-    initialize_single_source(graph, src)
+    """
+    if isinstance(graph, FrozenDigraph):
+        weights = graph.csr()[2]
+    elif isinstance(graph, CompactDigraph):
+        weights = graph._weights
+    else:
+        weights = None
+    if weights is not None:
+        if not len(weights):
+            return 0
+        largest = max(weights)
+        if min(weights) < 0 or largest > limit or \
+                not all(map(float.is_integer, weights)):
+            return None
+        return int(largest)
+    largest = 0
+    for e in graph.edges():
+        w = e.distance
+        if not 0 <= w <= limit or not float(w).is_integer():
+            return None
+        if w > largest:
+            largest = w
+    return int(largest)
+
+
+def _dial(graph, src, max_weight):
+    """Dijkstra's algorithm with a bucket queue, for integral weights from 0
+    to max_weight. Vertices may be queued again when their distance
+    decreases, and the outdated entries are skipped. The distances keep the
+    type of the weights; the bucket keys are their int values.
+
+    """
+    state = initialize_single_source(graph, src)
+    color, distance, predecessor = state.color, state.distance, \
+        state.predecessor
+    pq = BucketQueue(max_weight)
+    pq.insert(src, 0)
+    while not pq.is_empty():
+        d, u = pq.remove()
+        if color[u] == 'black' or d > distance[u]:    # outdated entry
+            continue
+        color[u] = 'black'
+        for v, w in graph.weighted_successors(u):
+            if color[v] != 'black' and distance[u] + w < distance[v]:
+                distance[v] = distance[u] + w
+                predecessor[v] = u
+                color[v] = 'gray'
+                pq.insert(v, int(distance[v]))
+    return state
+
+
+def dijkstra(graph, src, annotate=False):
+    """Dijkstra's algorithm of single source shortest path. If all weights
+    are integral from 0 to DIAL_MAX_WEIGHT, the vertices are kept in a bucket
+    queue (Dial's algorithm), else in an adaptable binary heap.
+
+    """
+    max_weight = _max_integer_weight(graph, DIAL_MAX_WEIGHT)
+    if max_weight is not None:
+        state = _dial(graph, src, max_weight)
+        if annotate:
+            state.annotate()
+        return state
+    state = initialize_single_source(graph, src)
+    color, distance, predecessor = (state.color, state.distance,
+                                    state.predecessor)
     pq = AdaptablePriorityQueue()
     for v in graph.vertices():
-        pq.insert(v)
+        pq.insert(_Key(v, distance[v]))
     while not pq.is_empty():
-        u = pq.remove()
-        u.color = 'gray'
-        for v in graph.successors(u):
-            if v.color == 'white':
-                relax(graph, u, v)
-                pq.update(v, v)         # the first v used as a key
-        u.color = 'black'
+        u = pq.remove()._vertex
+        color[u] = 'gray'
+        for v, w in graph.weighted_successors(u):
+            if color[v] == 'white' and distance[u] + w < distance[v]:
+                distance[v] = distance[u] + w
+                predecessor[v] = u
+                key = _Key(v, distance[v])
+                pq.update(key, key)     # the first key used to find v
+        color[u] = 'black'
+    if annotate:
+        state.annotate()
+    return state
+
+
+def _best_first(neighbors, src, dst=None, heuristic=None):
+    """Best-first search from src following neighbors(v), which yields
+    (vertex, weight) pairs. The heap starts with the source only and holds
+    (key, vertex) entries, the key being the distance plus the heuristic
+    estimate to dst; a vertex may be pushed again when its distance
+    decreases, and the outdated entries are skipped. The search stops as
+    soon as dst is settled, or runs to the end if dst is None.
+    Return the maps of distances and predecessors of the reached vertices.
+
+    """
+    distance = {src: 0}
+    predecessor = {src: None}
+    settled = set()
+    tie = count()                   # never compare vertices in the heap
+    heap = [(0, next(tie), src)]
+    while heap:
+        key, i, u = heapq.heappop(heap)
+        if u in settled:            # outdated entry
+            continue
+        if u == dst:
+            break
+        settled.add(u)
+        d = distance[u]
+        for v, w in neighbors(u):
+            if v not in settled and d + w < distance.get(v, float('inf')):
+                distance[v] = d + w
+                predecessor[v] = u
+                key = d + w + heuristic(v, dst) if heuristic else d + w
+                heapq.heappush(heap, (key, next(tie), v))
+    return distance, predecessor
+
+
+def shortest_distances(graph, src, reverse=False):
+    """Return the map of distances from src to the vertices it reaches, or
+    from the vertices that reach src if reverse is True.
+
+    """
+    graph._validate_vertex(src)
+    neighbors = (graph.weighted_predecessors if reverse
+                 else graph.weighted_successors)
+    return _best_first(neighbors, src)[0]
 
 
-def prim(graph, src):
+def astar(graph, src, dst, heuristic=None):
+    """A* search: point-to-point Dijkstra's algorithm guided towards dst by
+    heuristic(v, dst), a lower bound of the distance from v to dst. The
+    heuristic must be consistent, i.e. h(u) <= weight(u, v) + h(v) for every
+    edge; no heuristic gives plain Dijkstra's algorithm.
+    Return:
+        (path, distance), the path being a list of vertices from src to
+        dst, or ([], inf) if dst cannot be reached
+
+    """
+    graph._validate_vertex(src)
+    graph._validate_vertex(dst)
+    distance, predecessor = _best_first(graph.weighted_successors, src, dst,
+                                        heuristic)
+    if dst not in distance:
+        return [], float('inf')
+    return construct_path(src, dst, predecessor), distance[dst]
+
+
+def shortest_path(graph, src, dst):
+    """Point-to-point version of Dijkstra's algorithm, which stops as soon as
+    dst is settled (see astar).
+    Return:
+        (path, distance), the path being a list of vertices from src to
+        dst, or ([], inf) if dst cannot be reached
+
+    """
+    return astar(graph, src, dst)
+
+
+def bidirectional_shortest_path(graph, src, dst):
+    """Bidirectional version of shortest_path: a forward search from src over
+    the outgoing edges and a backward search from dst over the incoming edges
+    take turns, the one with the smaller heap top going first. Whenever an
+    edge reaches a vertex labeled by the other search, the path through it
+    is a candidate; the search stops when the two heap tops add up to at
+    least the best candidate.
+    Return:
+        (path, distance), or ([], inf) if dst cannot be reached
+
+    """
+    graph._validate_vertex(src)
+    graph._validate_vertex(dst)
+    if src == dst:
+        return [src], 0
+    inf = float('inf')
+    distance = ({src: 0}, {dst: 0})
+    predecessor = ({src: None}, {dst: None})
+    settled = (set(), set())
+    neighbors = (graph.weighted_successors, graph.weighted_predecessors)
+    tie = count()                   # never compare vertices in the heaps
+    heaps = ([(0, next(tie), src)], [(0, next(tie), dst)])
+    best, middle = inf, None
+    while heaps[0] and heaps[1]:
+        if heaps[0][0][0] + heaps[1][0][0] >= best:
+            break
+        side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+        d, i, u = heapq.heappop(heaps[side])
+        if u in settled[side]:      # outdated entry
+            continue
+        settled[side].add(u)
+        labels, other = distance[side], distance[1 - side]
+        for v, w in neighbors[side](u):
+            if v in settled[side]:
+                continue
+            if d + w < labels.get(v, inf):
+                labels[v] = d + w
+                predecessor[side][v] = u
+                heapq.heappush(heaps[side], (d + w, next(tie), v))
+            if v in other and labels[v] + other[v] < best:
+                best, middle = labels[v] + other[v], v
+    if middle is None:
+        return [], inf
+    path = construct_path(src, middle, predecessor[0])
+    v = predecessor[1][middle]
+    while v is not None:            # backward half, from middle to dst
+        path.append(v)
+        v = predecessor[1][v]
+    return path, best
+
+
+def prim(graph, src, annotate=False):
     """Prim's algorithm for minimum spanning tree."""
-    initialize_single_source(graph, src)
+    state = initialize_single_source(graph, src)
+    color, distance, predecessor = (state.color, state.distance,
+                                    state.predecessor)
     pq = AdaptablePriorityQueue()
     for v in graph.vertices():
-        pq.insert(v)
+        pq.insert(_Key(v, distance[v]))
     while not pq.is_empty():
-        u = pq.remove()
-        u.color = 'gray'
-        for v in graph.successors(u):
+        u = pq.remove()._vertex
+        color[u] = 'gray'
+        for v, w in graph.weighted_successors(u):
             # Prim and Dijkstra algorithm are almost the same,
             # except for the "relax function".
-            e = graph.edge(u, v)
-            if v.color == 'white' and e.distance < v.distance:
-                v.distance = e.distance
-                v.predecessor = u
-                pq.update(v, v)  # the first v used as a key
-        u.color = 'black'
+            if color[v] == 'white' and w < distance[v]:
+                distance[v] = w
+                predecessor[v] = u
+                key = _Key(v, distance[v])
+                pq.update(key, key)  # the first key used to find v
+        color[u] = 'black'
+    if annotate:
+        state.annotate()
+    return state
 
 
 def kruskal(graph, src):
     """Kruskal's algorithm for minimum spanning tree."""
-    initialize_single_source(graph, src)
     tree = []               # list of edges in spanning tree
     cluster = {v: DisjointSet(v) for v in graph.vertices()}
     pq = PriorityQueue()    # entries are edges in G, with weights as key
@@ -0,0 +1,209 @@
+# Copyright (C) 2018, bruinspaw <bruinspaw@gmail.com>
+#
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Binary graph file format
+Layout (native byte order, every section aligned to 8 bytes):
+    header:   magic b'GRPH', version, flags, size of a vertex id (4 or 8),
+              number of vertices n, number of CSR entries m,
+              size of the tag text in bytes
+    outgoing: offsets (n+1 int64), weights (m float64), targets (m ids)
+    incoming: the same three arrays, omitted for undirected graphs
+    tags:     offsets (n+1 int64) into the UTF-8 text of all vertex tags
+
+The reader maps the file into memory and the CSR arrays are memoryviews of
+the mapping, so nothing is copied and processes reading the same file
+share the page cache. Only the Vertex objects are created on loading.
+
+The tag tables, byte order flag and graph fingerprints are shared with the
+files of precomputed tables (landmarks.py, contraction.py).
+
+"""
+
+import mmap
+import sys
+import zlib
+from array import array
+from struct import Struct
+
+from .graph import *
+
+
+_MAGIC = b'GRPH'
+_VERSION = 1
+_UNDIRECTED = 1             # flag: undirected graph
+_BIG_ENDIAN = 2             # flag: arrays written in big-endian byte order
+_HEADER = Struct('<4sIIIQQQ')
+_EDGE = Struct('<qqd')      # tail number, head number, weight
+
+
+def byte_order_flags():
+    """Return the flags recording the byte order of the arrays written."""
+    return _BIG_ENDIAN if sys.byteorder == 'big' else 0
+
+
+def check_byte_order(flags):
+    """Raise ValueError if a file was written in another byte order."""
+    if bool(flags & _BIG_ENDIAN) != (sys.byteorder == 'big'):
+        raise ValueError('byte order of the file is not supported')
+
+
+def tag_table(vertices):
+    """Encode the tags of vertices as (offsets, text): the UTF-8 text of all
+    tags, and the int64 offsets of each tag in it.
+
+    """
+    text = bytearray()
+    offsets = array('q', [0])
+    for v in vertices:
+        text += str(v._tag).encode('utf-8')
+        offsets.append(len(text))
+    return offsets, text
+
+
+def table_tags(offsets, text):
+    """Decode the tags of a tag table as strings."""
+    return [str(text[offsets[i]:offsets[i+1]], 'utf-8')
+            for i in range(len(offsets) - 1)]
+
+
+def tagged_vertices(graph, offsets, text):
+    """Return the vertices of graph in the order of a tag table, matching
+    them by the text of their tags. Raise ValueError if the graph has
+    another number of vertices or lacks a tag.
+
+    """
+    if len(offsets) - 1 != graph.vertex_count():
+        raise ValueError('the number of vertices does not match the graph')
+    vertices = {str(v._tag): v for v in graph.vertices()}
+    try:
+        return [vertices[tag] for tag in table_tags(offsets, text)]
+    except KeyError as e:
+        raise ValueError('vertex {0} not in the graph'.format(e)) from None
+
+
+def graph_fingerprint(graph, vertices):
+    """Return a 64-bit fingerprint of the edges of graph, its vertices being
+    numbered in the order of the list vertices: the edge count in the high
+    32 bits, and in the low 32 bits a checksum of the (tail number, head
+    number, weight) triples that does not depend on the order of the edges.
+
+    """
+    column = {v: j for j, v in enumerate(vertices)}
+    pack = _EDGE.pack
+    checksum = 0
+    for i, u in enumerate(vertices):
+        for v, w in graph.weighted_successors(u):
+            checksum += zlib.crc32(pack(i, column[v], w))
+    return (graph.edge_count() & 0xffffffff) << 32 | checksum & 0xffffffff
+
+
+def _padding(size):
+    """Number of bytes needed to align size to 8 bytes."""
+    return -size % 8
+
+
+def _write_array(f, a):
+    """Write array a followed by the alignment padding."""
+    a.tofile(f)
+    f.write(bytes(_padding(len(a) * a.itemsize)))
+
+
+def _write_csr(f, csr):
+    offsets, targets, weights = csr
+    _write_array(f, array('q', offsets))
+    _write_array(f, array('d', weights))
+    _write_array(f, targets)
+
+
+def binary_graph_write(graph, filename):
+    """Write a graph (Digraph, Graph or a frozen snapshot of them) to a
+    binary graph file. Vertex tags are stored as text.
+
+    """
+    graph = as_frozen(graph)
+    vertices = [graph.vertex_by_id(i) for i in range(graph.vertex_count())]
+    offsets, targets, weights = graph.csr()
+    targets = array('q' if len(vertices) >= 2**31 else 'i', targets)
+    undirected = isinstance(graph, FrozenGraph)
+
+    tag_offsets, text = tag_table(vertices)
+    flags = byte_order_flags()
+    if undirected:
+        flags |= _UNDIRECTED
+    with open(filename, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, flags, targets.itemsize,
+                             len(vertices), len(targets), len(text)))
+        _write_csr(f, (offsets, targets, weights))
+        if not undirected:
+            sources = graph.reverse_csr()
+            _write_csr(f, (sources[0], array(targets.typecode, sources[1]),
+                           sources[2]))
+        _write_array(f, tag_offsets)
+        f.write(text)
+
+
+def binary_graph_read(filename):
+    """Map a binary graph file into memory and return a FrozenDigraph (or
+    FrozenGraph) whose CSR buffers are views of the mapping.
+
+    """
+    with open(filename, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, flags, itemsize, n, m, size = _HEADER.unpack_from(buffer)
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError('not a binary graph file: {0}'.format(filename))
+    check_byte_order(flags)
+
+    view = memoryview(buffer)
+    position = _HEADER.size
+
+    def take(fmt, count, itemsize=8):
+        nonlocal position
+        start, position = position, position + count * itemsize
+        section = view[start:position].cast(fmt)
+        position += _padding(count * itemsize)
+        return section
+
+    def take_csr():
+        offsets = take('q', n + 1)
+        weights = take('d', m)
+        targets = take('i' if itemsize == 4 else 'q', m, itemsize)
+        return offsets, targets, weights
+
+    outgoing = take_csr()
+    incoming = None if flags & _UNDIRECTED else take_csr()
+    tag_offsets = take('q', n + 1)
+    text = view[position:position + size]
+    vertices = [Vertex(tag) for tag in table_tags(tag_offsets, text)]
+    cls = FrozenGraph if flags & _UNDIRECTED else FrozenDigraph
+    return cls.from_csr(vertices, outgoing, incoming)
+
+
+def graph_convert(text_filename, binary_filename, progress=None):
+    """Convert a graph description file (see graph_read) to a binary
+    graph file.
+
+    """
+    binary_graph_write(graph_read(text_filename, progress=progress),
+                       binary_filename)
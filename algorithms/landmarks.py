@@ -0,0 +1,189 @@
+# Copyright (C) 2018, bruinspaw <bruinspaw@gmail.com>
+#
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""ALT: A* search with landmarks and the triangle inequality
+For a landmark L and the distances d(L, v) and d(v, L) of every vertex v,
+    d(v, t) >= d(L, t) - d(L, v)    and    d(v, t) >= d(v, L) - d(t, L),
+so the maximum over all landmarks is a consistent heuristic for astar().
+
+References:
+    Goldberg, Harrelson, Computing the Shortest Path: A* Search Meets
+    Graph Theory, SODA 2005
+
+"""
+
+from array import array
+from struct import Struct
+
+from .graph import *
+from .graphalgo import *
+from .graphfile import (byte_order_flags, check_byte_order, graph_fingerprint,
+                        tag_table, tagged_vertices)
+
+
+_MAGIC = b'ALT2'
+_HEADER = Struct('<4sIQQQQ')    # magic, flags, fingerprint, vertices,
+                                # landmarks, text
+
+
+class Landmarks:
+    """Distance tables of a set of landmarks:
+        self._vertices = [ vertex of each table column ]
+        self._column = { vertex: column }
+        self._landmarks = [ column of each landmark ]
+        self._from[i][j] = distance from landmark i to vertex j
+        self._to[i][j] = distance from vertex j to landmark i
+        self._fingerprint = fingerprint of the edges of the graph, see
+            graph_fingerprint()
+    Unreachable distances are inf and give no bound.
+
+    """
+    def __init__(self, graph, k=8, landmarks=None):
+        """Preprocess the graph with k landmarks chosen by farthest selection:
+        each new landmark is the vertex farthest from the chosen ones (an
+        unreached one first). A list of landmark vertices can be given
+        instead.
+
+        """
+        self._vertices = list(graph.vertices())
+        self._column = {v: j for j, v in enumerate(self._vertices)}
+        self._fingerprint = graph_fingerprint(graph, self._vertices)
+        self._landmarks = []
+        self._from = []
+        self._to = []
+        if landmarks is None:
+            self._select(graph, k)
+        for v in landmarks or []:
+            if self._column[v] not in self._landmarks:
+                self._add(graph, v)
+
+    def _table(self, distances):
+        """Return the distances of a map as an array of columns."""
+        inf = float('inf')
+        return array('d', (distances.get(v, inf) for v in self._vertices))
+
+    def _add(self, graph, v):
+        """Add v as a landmark, computing its distance tables."""
+        self._landmarks.append(self._column[v])
+        self._from.append(self._table(shortest_distances(graph, v)))
+        self._to.append(self._table(shortest_distances(graph, v, True)))
+
+    def _select(self, graph, k):
+        """Choose up to k landmarks, adding them to the tables."""
+        if not self._vertices:
+            return
+        nearest = array('d', [float('inf')]) * len(self._vertices)
+        v = self._vertices[0]
+        # start from the vertex farthest from an arbitrary one
+        start = self._table(shortest_distances(graph, v))
+        far = max((d, j) for j, d in enumerate(start) if d < float('inf'))
+        v = self._vertices[far[1]]
+        while len(self._landmarks) < min(k, len(self._vertices)):
+            self._add(graph, v)
+            table = self._from[-1]
+            for j in range(len(nearest)):
+                nearest[j] = min(nearest[j], table[j])
+            candidates = [(d, j) for j, d in enumerate(nearest)
+                          if j not in self._landmarks]
+            if not candidates:
+                break
+            v = self._vertices[max(candidates)[1]]
+
+    def landmarks(self):
+        """Return the list of landmark vertices."""
+        return [self._vertices[j] for j in self._landmarks]
+
+    def heuristic(self, v, t):
+        """Lower bound of the distance from v to t, for astar()."""
+        a, b = self._column[v], self._column[t]
+        bound = 0
+        for forward, backward in zip(self._from, self._to):
+            # bounds are ignored when a distance is inf (no information)
+            lower = forward[b] - forward[a]
+            if lower > bound and forward[a] < float('inf'):
+                bound = lower
+            lower = backward[a] - backward[b]
+            if lower > bound and backward[b] < float('inf'):
+                bound = lower
+        return bound
+
+    def save(self, filename):
+        """Write the tables to a file. The vertices are stored by the text of
+        their tags, so the graph must be made of Vertex objects with unique
+        tags. The fingerprint of the edges is stored to check the graph on
+        loading.
+
+        """
+        offsets, text = tag_table(self._vertices)
+        with open(filename, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, byte_order_flags(), self._fingerprint,
+                                 len(self._vertices), len(self._landmarks),
+                                 len(text)))
+            array('q', self._landmarks).tofile(f)
+            offsets.tofile(f)
+            for table in self._from + self._to:
+                table.tofile(f)
+            f.write(text)
+
+    @classmethod
+    def load(cls, graph, filename):
+        """Read the tables written by save(), matching the vertices of the
+        graph by tag. Raise ValueError if the file was written for another
+        graph (other tags or edges) or in another byte order.
+
+        """
+        with open(filename, 'rb') as f:
+            magic, flags, fingerprint, n, k, size = _HEADER.unpack(
+                f.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError('not a landmark file: {0}'.format(filename))
+            check_byte_order(flags)
+            landmarks = array('q')
+            landmarks.fromfile(f, k)
+            offsets = array('q')
+            offsets.fromfile(f, n + 1)
+            tables = []
+            for i in range(2 * k):
+                table = array('d')
+                table.fromfile(f, n)
+                tables.append(table)
+            text = f.read(size)
+        result = cls.__new__(cls)
+        result._vertices = tagged_vertices(graph, offsets, text)
+        if graph_fingerprint(graph, result._vertices) != fingerprint:
+            raise ValueError('landmark file does not match the graph')
+        result._fingerprint = fingerprint
+        result._column = {v: j for j, v in enumerate(result._vertices)}
+        result._landmarks = list(landmarks)
+        result._from, result._to = tables[:k], tables[k:]
+        return result
+
+
+def alt_shortest_path(graph, src, dst, landmarks):
+    """A* search guided by the landmark heuristic.
+    Return:
+        (path, distance), or ([], inf) if dst cannot be reached
+
+    """
+    return astar(graph, src, dst, landmarks.heuristic)
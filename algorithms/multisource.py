@@ -0,0 +1,181 @@
+# Copyright (C) 2018, bruinspaw <bruinspaw@gmail.com>
+#
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Shortest paths from many sources in parallel
+The CSR buffers of the graph are copied once into a block of shared memory,
+which the worker processes map without copying; each task is one source.
+Distances are indexed by the vertex ids of the frozen graph, i.e. column j
+is the j-th vertex of graph.vertices().
+
+"""
+
+import heapq
+import os
+from array import array
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+from .graph import *
+
+try:
+    import numpy
+except ImportError:         # optional, for distance_matrix()
+    numpy = None
+
+
+def csr_dijkstra(offsets, targets, weights, src, predecessor=None):
+    """Dijkstra's algorithm on CSR buffers, with a binary heap of (distance,
+    vertex) entries; outdated entries are skipped when removed. Return the
+    array of distances from vertex id src. If an array predecessor is given,
+    the predecessor id of each reached vertex is stored in it.
+
+    """
+    distance = array('d', [float('inf')]) * (len(offsets) - 1)
+    distance[src] = 0.0
+    heap = [(0.0, src)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > distance[u]:         # outdated entry
+            continue
+        for k in range(offsets[u], offsets[u+1]):
+            v = targets[k]
+            dv = d + weights[k]
+            if dv < distance[v]:
+                distance[v] = dv
+                if predecessor is not None:
+                    predecessor[v] = u
+                heapq.heappush(heap, (dv, v))
+    return distance
+
+
+class SharedCSR:
+    """CSR buffers of a graph in a block of shared memory:
+        offsets (n+1 int64), weights (m float64), targets (m int64)
+    Create it with the graph in the parent process, and attach() to it by
+    name in the workers.
+
+    """
+    def __init__(self, graph=None, name=None, n=0, m=0):
+        """Copy the CSR buffers of graph into new shared memory, or attach
+        to the shared memory of the given name if graph is None.
+
+        """
+        if graph is not None:
+            graph = as_frozen(graph)
+            offsets, targets, weights = graph.csr()
+            n, m = len(offsets) - 1, len(targets)
+            self._memory = SharedMemory(create=True,
+                                        size=max(8 * (n + 1 + 2 * m), 1))
+        else:
+            self._memory = SharedMemory(name=name)
+        self.n, self.m = n, m
+        view = self._memory.buf
+        self.offsets = view[:8 * (n + 1)].cast('q')
+        self.weights = view[8 * (n + 1):8 * (n + 1 + m)].cast('d')
+        self.targets = view[8 * (n + 1 + m):8 * (n + 1 + 2 * m)].cast('q')
+        if graph is not None:
+            self.offsets[:] = array('q', offsets)
+            self.weights[:] = array('d', weights)
+            self.targets[:] = array('q', targets)
+
+    @classmethod
+    def attach(cls, name, n, m):
+        """Attach to the shared memory created by another process."""
+        return cls(name=name, n=n, m=m)
+
+    def key(self):
+        """Return the (name, n, m) arguments of attach()."""
+        return self._memory.name, self.n, self.m
+
+    def close(self, unlink=False):
+        """Release the views and the memory, and free it if unlink is True
+        (only by the creating process).
+
+        """
+        for view in (self.offsets, self.weights, self.targets):
+            view.release()
+        self._memory.close()
+        if unlink:
+            self._memory.unlink()
+
+
+_shared = None              # shared graph of a worker process
+
+
+def _attach(key):
+    """Initializer of a worker process."""
+    global _shared
+    _shared = SharedCSR.attach(*key)
+
+
+def _solve(src):
+    """Task of a worker process: distances from one source."""
+    return src, csr_dijkstra(_shared.offsets, _shared.targets,
+                             _shared.weights, src)
+
+
+def multi_source_dijkstra(graph, sources, workers=None):
+    """Dijkstra's algorithm from each of the sources, fanned out over a pool
+    of worker processes sharing one copy of the graph. Yield (source,
+    distances) in the order of sources as soon as they are computed, the
+    distances being an array indexed by vertex id.
+    Arg:
+        graph: a directed or undirected graph, or a frozen snapshot of one
+        sources: an iteration of vertices of the graph
+        workers: number of processes (default: the number of CPUs), or 0
+            to compute in the calling process
+
+    """
+    frozen = as_frozen(graph)
+    sources = list(sources)
+    ids = [frozen.vertex_id(s) for s in sources]
+    if workers == 0:
+        offsets, targets, weights = frozen.csr()
+        for s, i in zip(sources, ids):
+            yield s, csr_dijkstra(offsets, targets, weights, i)
+        return
+    shared = SharedCSR(frozen)
+    try:
+        with Pool(workers or os.cpu_count(), _attach,
+                  (shared.key(),)) as pool:
+            for s, (i, distance) in zip(sources, pool.imap(_solve, ids)):
+                yield s, distance
+    finally:
+        shared.close(unlink=True)
+
+
+def distance_matrix(graph, sources, workers=None):
+    """Return the distances from each of the sources to every vertex, one row
+    per source: a 2-dimensional numpy array if numpy is installed, else a
+    list of arrays.
+
+    """
+    rows = [distance for s, distance
+            in multi_source_dijkstra(graph, sources, workers)]
+    if numpy is None:
+        return rows
+    matrix = numpy.empty((len(rows), graph.vertex_count()))
+    for i, row in enumerate(rows):
+        matrix[i] = numpy.frombuffer(row, dtype=numpy.float64)
+    return matrix
@@ -0,0 +1,291 @@
+# Copyright (C) 2018, bruinspaw <bruinspaw@gmail.com>
+#
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Graph partitioning and multi-process breadth-first search
+Contents:
+    Shard: the vertices owned by one part of a graph, with their outgoing
+        edges and a table of ghost (boundary) vertices owned by others
+    partition: split a graph into shards by vertex hash or id range
+    sharded_breadth_first_search: level-synchronous BFS with one process
+        per shard, exchanging the discovered vertices at every level
+
+Vertices are identified by the integer ids of the frozen (CSR) graph.
+
+"""
+
+import heapq
+import multiprocessing
+from array import array
+from itertools import repeat
+
+from .graph import *
+from .graphalgo import SearchState
+
+
+class Shard:
+    """One part of a partitioned graph:
+        self._vertices = [ global id of each owned vertex ]
+        self._local = { global id: local index of an owned vertex }
+        outgoing edges of the owned vertex with local index i:
+            self._targets[self._offsets[i]:self._offsets[i+1]] (global ids)
+        self._ghosts = { global id: owner shard } of the vertices reached by
+            an edge of this shard but owned by another one
+    The shard also keeps the breadth-first search state of its vertices and
+    its part of the current frontier, in the order of the search:
+        self._frontier = [ local index of a vertex of the frontier ]
+
+    """
+    def __init__(self, index, vertices, csr, owner):
+        """Create shard number index owning the given vertex ids, with the
+        outgoing edges taken from the CSR buffers of the whole graph.
+
+        """
+        offsets, targets = csr[0], csr[1]
+        self._index = index
+        self._vertices = array('q', vertices)
+        self._local = {v: i for i, v in enumerate(vertices)}
+        self._offsets = array('q', [0])
+        self._targets = array(targets.typecode
+                              if isinstance(targets, array) else 'q')
+        self._ghosts = {}
+        for v in vertices:
+            for k in range(offsets[v], offsets[v+1]):
+                w = targets[k]
+                self._targets.append(w)
+                if owner[w] != index:
+                    self._ghosts[w] = owner[w]
+            self._offsets.append(len(self._targets))
+        self.reset()
+
+    def __repr__(self):
+        return 'shard {0}: {1} vertices, {2} edges, {3} ghosts'.format(
+            self._index, len(self._vertices), len(self._targets),
+            len(self._ghosts))
+
+    def reset(self):
+        """Clear the search state, -1 meaning not reached."""
+        self._distance = array('q', [-1]) * len(self._vertices)
+        self._predecessor = array('q', [-1]) * len(self._vertices)
+        self._frontier = array('q')     # local indices
+
+    def settle(self, level, batches):
+        """Settle the owned vertices first reached at the given level, which
+        become the frontier of the shard. batches holds the bytes of the
+        batches returned by expand() for this shard. Each (target, parent,
+        rank, position) quadruple offers a parent of the given rank in the
+        level order, whose edge at the given position of its row reaches the
+        target; a target takes the parent with the smallest (rank,
+        position), which is the parent that a queue-based search would have
+        dequeued first. Return the bytes of the (rank, position) pairs of the
+        settled vertices, in increasing order, which is the order of the new
+        frontier.
+
+        """
+        best = {}
+        for batch in batches:
+            offers = array('q')
+            offers.frombytes(batch)
+            for k in range(0, len(offers), 4):
+                i = self._local[offers[k]]
+                if self._distance[i] < 0:
+                    key = offers[k+2], offers[k+3]
+                    if i not in best or key < best[i][0]:
+                        best[i] = key, offers[k+1]
+        self._frontier = array('q', sorted(best, key=best.get))
+        pairs = array('q')
+        for i in self._frontier:
+            key, parent = best[i]
+            self._distance[i] = level
+            self._predecessor[i] = parent
+            pairs.extend(key)
+        return pairs.tobytes()
+
+    def expand(self, ranks):
+        """Scan the outgoing edges of the frontier, given the bytes of the
+        ranks of its vertices in the level order. Return { owner shard:
+        bytes of the (target, parent, rank, position) quadruples } for the
+        targets that are not known to be reached, each target listed once
+        with the smallest (rank, position) of this shard.
+
+        """
+        levels = array('q')
+        levels.frombytes(ranks)
+        offers = {}
+        seen = set()
+        for rank, i in zip(levels, self._frontier):     # increasing ranks
+            v = self._vertices[i]
+            start = self._offsets[i]
+            for k in range(start, self._offsets[i+1]):
+                w = self._targets[k]
+                if w in seen:
+                    continue
+                seen.add(w)
+                if w in self._local:
+                    if self._distance[self._local[w]] >= 0:
+                        continue
+                    owner = self._index
+                else:
+                    owner = self._ghosts[w]
+                batch = offers.get(owner)
+                if batch is None:
+                    batch = offers[owner] = array('q')
+                batch.extend((w, v, rank, k - start))
+        return {owner: batch.tobytes() for owner, batch in offers.items()}
+
+    def result(self):
+        """Return the owned vertex ids, distances and predecessors."""
+        return self._vertices, self._distance, self._predecessor
+
+
+def partition(graph, shards, method='hash'):
+    """Split a graph into a number of shards. The method is 'hash' (vertex
+    id modulo the number of shards) or 'range' (blocks of consecutive ids).
+    Return the list of shards and the owner shard of every vertex id.
+
+    """
+    graph = as_frozen(graph)
+    n = graph.vertex_count()
+    if method == 'hash':
+        owner = array('i', (v % shards for v in range(n)))
+    elif method == 'range':
+        size = -(-n // shards)      # ceiling division
+        owner = array('i', (v // size for v in range(n)))
+    else:
+        raise ValueError('unknown partition method: {0}'.format(method))
+    members = [[] for i in range(shards)]
+    for v in range(n):
+        members[owner[v]].append(v)
+    return ([Shard(i, members[i], graph.csr(), owner) for i in range(shards)],
+            owner)
+
+
+def _serve(shard, conn):
+    """Worker process: run the commands sent to a shard."""
+    while True:
+        command, args = conn.recv()
+        if command == 'stop':
+            break
+        conn.send(getattr(shard, command)(*args))
+    conn.close()
+
+
+class _LocalShard:
+    """Same protocol as a worker process, calling the shard directly."""
+    def __init__(self, shard):
+        self._shard = shard
+        self._reply = None
+
+    def send(self, message):
+        command, args = message
+        if command != 'stop':
+            self._reply = getattr(self._shard, command)(*args)
+
+    def recv(self):
+        return self._reply
+
+
+def sharded_breadth_first_search(graph, start, shards=2, method='hash',
+                                 processes=True):
+    """Breadth-first search with one worker process per shard. At each level
+    every shard expands its part of the frontier, and the discovered
+    vertices are passed, as opaque per-owner batches, to their owners to be
+    settled. The shards return their settled vertices sorted by (parent
+    rank, edge position), and merging these lists ranks the next frontier.
+    Ties are thus broken in the order of a queue-based search, so the
+    distances and predecessors are those of breadth_first_search.
+    Arg:
+        graph: a directed or undirected graph, or a frozen snapshot of one
+        start: start vertex
+        shards: number of shards (and of worker processes)
+        method: partition method, see partition()
+        processes: run the shards in the calling process if False
+    Return:
+        the search state, as returned by breadth_first_search
+
+    """
+    frozen = as_frozen(graph)
+    parts, owner = partition(frozen, shards, method)
+    if processes:
+        links, workers = [], []
+        for shard in parts:
+            parent, child = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=_serve,
+                                             args=(shard, child))
+            worker.start()
+            links.append(parent)
+            workers.append(worker)
+    else:
+        links = [_LocalShard(shard) for shard in parts]
+
+    def call(command, args_of_shard):
+        for i, args in args_of_shard.items():
+            links[i].send((command, args))
+        return {i: links[i].recv() for i in args_of_shard}
+
+    try:
+        s = frozen.vertex_id(start)
+        level = 0
+        seed = array('q', [s, -1, 0, 0]).tobytes()
+        settled = call('settle', {owner[s]: (0, [seed])})
+        while True:
+            keys = {}
+            for i, reply in settled.items():
+                pairs = array('q')
+                pairs.frombytes(reply)
+                if pairs:
+                    keys[i] = pairs
+            if not keys:
+                break
+            ranks = {i: array('q') for i in keys}
+            merged = heapq.merge(*(zip(pairs[::2], pairs[1::2], repeat(i))
+                                   for i, pairs in keys.items()))
+            for rank, (r, position, i) in enumerate(merged):
+                ranks[i].append(rank)
+            replies = call('expand', {i: (rank.tobytes(),)
+                                      for i, rank in ranks.items()})
+            batches = {}
+            for i in sorted(replies):
+                for j, batch in replies[i].items():
+                    batches.setdefault(j, []).append(batch)
+            level += 1
+            settled = call('settle', {j: (level, part) for j, part
+                                      in batches.items()})
+        results = call('result', {i: () for i in range(shards)})
+    finally:
+        for link in links:
+            link.send(('stop', ()))
+        if processes:
+            for worker in workers:
+                worker.join()
+
+    state = SearchState(graph)
+    for vertices, distance, predecessor in results.values():
+        for i, v in enumerate(vertices):
+            if distance[i] >= 0:
+                u = frozen.vertex_by_id(v)
+                state.color[u] = 'black'
+                state.distance[u] = distance[i]
+                if predecessor[i] >= 0:
+                    state.predecessor[u] = frozen.vertex_by_id(predecessor[i])
+    return state
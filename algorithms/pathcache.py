@@ -0,0 +1,113 @@
+# Copyright (C) 2018, bruinspaw <bruinspaw@gmail.com>
+#
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Cache of shortest-path trees
+The trees computed from a source are kept, least recently used first, under
+a (source, version) key: a change of the graph bumps its version, so a tree
+computed before the change is never found again, and the stale trees are
+dropped as soon as the change is seen.
+
+"""
+
+from collections import OrderedDict
+
+from .graph import *
+from .graphalgo import *
+
+
+class ShortestPathCache:
+    """Bounded LRU cache of the search states of a shortest-path algorithm:
+        self._trees = OrderedDict({ (source, version): state })
+    with the hit, miss, eviction (dropped for room) and invalidation
+    (dropped as stale) counts.
+
+    """
+    def __init__(self, graph, capacity=128, algorithm=dijkstra):
+        """Cache up to capacity trees of graph, computed by
+        algorithm(graph, source), which returns a search state.
+
+        """
+        if capacity < 1:
+            raise ValueError('capacity must be positive')
+        self._graph = graph
+        self._capacity = capacity
+        self._algorithm = algorithm
+        self._trees = OrderedDict()
+        self._version = graph.version()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def __len__(self):
+        return len(self._trees)
+
+    def tree(self, src):
+        """Return the search state of the shortest paths from src, as
+        computed on the current version of the graph. The state is shared
+        by the later calls and must not be changed.
+
+        """
+        version = self._graph.version()
+        if version != self._version:     # the graph changed
+            self.invalidations += len(self._trees)
+            self._trees.clear()
+            self._version = version
+        key = (src, version)
+        state = self._trees.get(key)
+        if state is not None:
+            self.hits += 1
+            self._trees.move_to_end(key)
+            return state
+        self.misses += 1
+        state = self._algorithm(self._graph, src)
+        self._trees[key] = state
+        if len(self._trees) > self._capacity:
+            self._trees.popitem(last=False)
+            self.evictions += 1
+        return state
+
+    def distance(self, src, dst):
+        """Return the distance from src to dst."""
+        return self.tree(src).distance[dst]
+
+    def path(self, src, dst):
+        """Return (path, distance) from src to dst, or ([], inf) if dst
+        cannot be reached.
+
+        """
+        state = self.tree(src)
+        return (construct_path(src, dst, state.predecessor),
+                state.distance[dst])
+
+    def stats(self):
+        """Return the counts of hits, misses, evictions and invalidations,
+        and the number of cached trees.
+
+        """
+        return {'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'size': len(self._trees)}
+
+    def clear(self):
+        """Drop all the cached trees, keeping the counts."""
+        self._trees.clear()
@@ -229,6 +229,57 @@ class AdaptablePriorityQueue(PriorityQueue):
         self._reheapify(index)
 
 
+class BucketQueue:
+    """A monotone priority queue of items with small non-negative integer
+    keys (Dial's bucket queue). The keys of the items in the queue span at
+    most max_step + 1 values from the last removed key, so a circular array
+    of max_step + 1 buckets holds them, bucket key % (max_step + 1) holding
+    the items of one key. Insertion is O(1), removal scans the empty buckets
+    up to the next key. Items are not compared and may be inserted again
+    with another key; the caller skips the outdated ones.
+
+    """
+    def __init__(self, max_step):
+        """Create an empty queue whose keys never exceed the last removed
+        key by more than max_step.
+
+        """
+        self._buckets = [[] for i in range(max_step + 1)]
+        self._current = 0           # key of the last removed item
+        self._size = 0
+
+    def __len__(self):
+        """Return the number of items in the queue."""
+        return self._size
+
+    def is_empty(self):
+        """Return True if the queue is empty."""
+        return self._size == 0
+
+    def insert(self, item, key):
+        """Add an item with an integer key, from the last removed key to
+        max_step more than it.
+
+        """
+        if not self._current <= key < self._current + len(self._buckets):
+            raise ValueError('key out of the range of the bucket queue')
+        self._buckets[key % len(self._buckets)].append(item)
+        self._size += 1
+
+    def remove(self):
+        """Remove and return (key, item) with the minimum key.
+        Raise EmptyPQueueError exception if empty.
+
+        """
+        if self._size == 0:
+            raise EmptyPQueueError
+        n = len(self._buckets)
+        while not self._buckets[self._current % n]:
+            self._current += 1
+        self._size -= 1
+        return self._current, self._buckets[self._current % n].pop()
+
+
 if __name__ == '__main__':
     #  priority queue of primitive objects
     pq = PriorityQueue([14, 5, 8, 25, 9, 11, 17,
@@ -0,0 +1,167 @@
+# Copyright (C) 2018, bruinspaw <bruinspaw@gmail.com>
+#
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Incremental topological order of a directed acyclic graph
+Each vertex keeps a position, and every edge goes from a lower to a higher
+position. An edge (u, v) with u already before v keeps the order. Otherwise
+only the vertices with positions between v and u can be out of order: the
+ones reached forward from v and backward from u are found by two searches
+limited to that range, and their positions are dealt out again, those
+reaching u first. The forward search reaching u means the edge would close
+a cycle, and it is rejected.
+
+References:
+    Pearce, Kelly, A Dynamic Topological Sort Algorithm for Directed Acyclic
+    Graphs, Journal of Experimental Algorithmics 11, 2006
+
+"""
+
+from .graph import *
+from .graphalgo import topological_order
+
+
+class TopologicalOrder:
+    """Topological order of a Digraph, kept up to date while edges and
+    vertices are inserted through it:
+        self._position = { v: position of v in the order }
+    Positions are increasing but not necessarily consecutive. If the graph
+    is changed directly, the order is computed again when next used.
+
+    """
+    def __init__(self, graph):
+        """Sort the graph, raise ValueError if it has a cycle."""
+        self._graph = graph
+        self._sort()
+
+    def _sort(self):
+        """Compute the order of the whole graph."""
+        self._position = {v: i for i, v
+                          in enumerate(topological_order(self._graph))}
+        self._next = len(self._position)
+        self._version = self._graph.version()
+
+    def _check(self):
+        """Sort again if the graph was changed behind our back."""
+        if self._graph.version() != self._version:
+            self._sort()
+
+    def _search(self, start, neighbors, inside, target=None):
+        """Vertices reached from start by neighbors(v) through the vertices
+        v for which inside(v) holds, or None if target is reached.
+
+        """
+        seen = {start}
+        stack = [start]
+        while stack:
+            u = stack.pop()
+            for v in neighbors(u):
+                if v is target:
+                    return None
+                if v not in seen and inside(v):
+                    seen.add(v)
+                    stack.append(v)
+        return seen
+
+    def precedes(self, u, v):
+        """Return True if u comes before v in the order, in O(1)."""
+        self._check()
+        return self._position[u] < self._position[v]
+
+    def position(self, v):
+        """Return the position of v, increasing along every edge."""
+        self._check()
+        return self._position[v]
+
+    def order(self):
+        """Return the list of vertices in topological order."""
+        self._check()
+        return sorted(self._position, key=self._position.get)
+
+    def insert_vertex(self, v):
+        """Insert a vertex into the graph, placed last in the order."""
+        self._check()
+        if v not in self._position:
+            self._graph.insert_vertex(v)
+            self._position[v] = self._next
+            self._next += 1
+            self._version = self._graph.version()
+        return v
+
+    def insert_edge(self, e):
+        """Insert an edge into the graph (adding its endpoints if needed)
+        and update the order. Raise ValueError, leaving the graph as it
+        was, if the edge would make a cycle.
+
+        """
+        self._check()
+        u, v = e.endpoints()
+        if u is v:
+            raise ValueError('the edge would make a cycle')
+        for x in (u, v):
+            if not isinstance(x, Vertex):
+                raise TypeError('vertex type expected')
+        position = self._position
+        forward = None
+        if u in position and v in position and position[v] < position[u]:
+            # a new endpoint has no edges yet, so only then can a cycle close
+            upper = position[u]
+            forward = self._search(v, self._graph.successors,
+                                   lambda x: position[x] < upper, u)
+            if forward is None:
+                raise ValueError('the edge would make a cycle')
+        for x in (u, v):
+            self.insert_vertex(x)
+        lower, upper = position[v], position[u]
+        if lower < upper:
+            # forward from v and backward from u, between the two
+            if forward is None:
+                forward = self._search(v, self._graph.successors,
+                                       lambda x: position[x] < upper)
+            backward = self._search(u, self._graph.predecessors,
+                                    lambda x: position[x] > lower)
+            backward = sorted(backward, key=position.get)
+            forward = sorted(forward, key=position.get)
+            slots = sorted(position[x] for x in backward + forward)
+            for x, i in zip(backward + forward, slots):
+                position[x] = i
+        self._graph.insert_edge(e)
+        self._version = self._graph.version()
+        return e
+
+    def remove_edge(self, u, v):
+        """Remove the edge from u to v from the graph; the order stays
+        valid.
+
+        """
+        self._check()
+        e = self._graph.remove_edge(u, v)
+        self._version = self._graph.version()
+        return e
+
+    def remove_vertex(self, v):
+        """Remove a vertex and its edges from the graph."""
+        self._check()
+        self._graph.remove_vertex(v)
+        del self._position[v]
+        self._version = self._graph.version()
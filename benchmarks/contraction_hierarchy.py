@@ -0,0 +1,111 @@
+# Copyright (C) 2018, bruinspaw <bruinspaw@gmail.com>
+#
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Query latency of contraction hierarchies against dijkstra() (one full
+search per query) and shortest_path() (stopping at the target), on the
+chap14 examples with non-negative weights and on grid graphs with random
+weights. The distances of the three are checked to agree.
+
+Usage: python contraction_hierarchy.py [grid sizes...] [-q queries]
+
+"""
+
+import sys
+sys.path.append('..')
+
+import random
+import time
+
+from algorithms.graph import *
+from algorithms.graphalgo import *
+from algorithms.contraction import *
+
+
+EXAMPLES = ['../chap14/example1.txt', '../chap14/example2.txt',
+            '../chap14/breadth_first_search/example.txt',
+            '../chap14/minimum_spanning_tree/example.txt',
+            '../chap14/shortest_path/dijkstra.txt']
+
+
+def grid_graph(size):
+    """Undirected size x size grid, with weights from 1 to 10."""
+    g = Graph()
+    cells = [[g.insert_vertex(Vertex('{0},{1}'.format(i, j)))
+              for j in range(size)] for i in range(size)]
+    for i in range(size):
+        for j in range(size):
+            if i + 1 < size:
+                g.insert_edge(Edge(cells[i][j], cells[i+1][j], None,
+                                   random.randint(1, 10)))
+            if j + 1 < size:
+                g.insert_edge(Edge(cells[i][j], cells[i][j+1], None,
+                                   random.randint(1, 10)))
+    return g
+
+
+def per_query(function, queries):
+    """Return the results of function on the queries and the average
+    seconds per query.
+
+    """
+    start = time.perf_counter()
+    results = [function(s, t) for s, t in queries]
+    return results, (time.perf_counter() - start) / len(queries)
+
+
+def benchmark(name, g, count):
+    vertices = list(g.vertices())
+    queries = [(random.choice(vertices), random.choice(vertices))
+               for k in range(count)]
+    start = time.perf_counter()
+    hierarchy = ContractionHierarchy(g)
+    build = time.perf_counter() - start
+    full, t_full = per_query(
+        lambda s, t: dijkstra(g, s).distance[t], queries)
+    early, t_early = per_query(
+        lambda s, t: shortest_path(g, s, t)[1], queries)
+    ch, t_ch = per_query(lambda s, t: hierarchy.query(s, t)[1], queries)
+    assert full == early == ch, 'distances differ on ' + name
+    print('{0:<36}{1:>8}{2:>10}{3:>10.3f}{4:>12.1f}{5:>12.1f}{6:>10.1f}'
+          .format(name, g.vertex_count(), hierarchy.shortcut_count(), build,
+                  t_full * 1e6, t_early * 1e6, t_ch * 1e6))
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    count = 100
+    if '-q' in args:
+        i = args.index('-q')
+        count = int(args[i+1])
+        del args[i:i+2]
+    sizes = [int(arg) for arg in args] or [10, 30, 50]
+    random.seed(1)
+    print('{0:<36}{1:>8}{2:>10}{3:>10}{4:>12}{5:>12}{6:>10}'.format(
+        'graph', 'vertices', 'shortcuts', 'build s', 'dijkstra us',
+        'p2p us', 'ch us'))
+    for filename in EXAMPLES:
+        benchmark(filename.replace('../chap14/', ''), graph_read(filename),
+                  count)
+    for size in sizes:
+        benchmark('grid {0}x{0}'.format(size), grid_graph(size), count)
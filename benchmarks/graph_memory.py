@@ -0,0 +1,132 @@
+# Copyright (C) 2018, bruinspaw <bruinspaw@gmail.com>
+#
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Memory used per vertex and per edge by the graph representations,
+measured with tracemalloc on a random digraph. Tags and the edge list are
+created before measuring, so only the graph structures are counted. The
+"Digraph (before)" row uses the vertex class of the original algorithms,
+with per-instance dicts and search state, as a baseline.
+
+Usage: python graph_memory.py [vertices] [edges]
+
+"""
+
+import sys
+sys.path.append('..')
+
+import random
+import tracemalloc
+
+from algorithms.graph import *
+from algorithms.compactgraph import *
+
+
+def traced(build, *args):
+    """Return the result of build(*args) and the bytes allocated by it."""
+    tracemalloc.start()
+    result = build(*args)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+class BaselineVertex:
+    """Vertex as it was before the search state moved out of it: no slots,
+    and the search attributes stored in every instance. It reports Vertex as
+    its class to pass the type checks of the graphs.
+
+    """
+    __class__ = property(lambda self: Vertex)
+
+    def __init__(self, tag):
+        self._tag = tag
+        self.color = 'white'
+        self.predecessor = None
+        self.distance = float('inf')
+        self.discover = 0
+        self.finish = 0
+
+    def __lt__(self, other):
+        return self.distance < other.distance
+
+    def __hash__(self):
+        return hash(id(self))
+
+    def __eq__(self, other):
+        return self is other
+
+    def __repr__(self):
+        return str(self._tag)
+
+
+def build_digraph(tags, edges, vertex=Vertex):
+    g = Digraph()
+    vertices = [g.insert_vertex(vertex(tag)) for tag in tags]
+    g.insert_edges(Edge(vertices[i], vertices[j], tag, w)
+                   for i, j, tag, w in edges)
+    return g
+
+
+def build_compact(tags, edges):
+    g = CompactDigraph()
+    for tag in tags:
+        g.insert_vertex(tag)
+    for i, j, tag, w in edges:
+        g.insert_edge(i, j, w)
+    return g
+
+
+def report(name, n, m, vertex_bytes, total_bytes):
+    print('{0:<18}{1:>12.1f}{2:>12.1f}{3:>14}'.format(
+        name, vertex_bytes / n, (total_bytes - vertex_bytes) / m,
+        total_bytes))
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    m = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    random.seed(1)
+    tags = ['v{0}'.format(i) for i in range(n)]
+    pairs = {(random.randrange(n), random.randrange(n)) for k in range(m)}
+    edges = [(i, j, 'e{0}'.format(k), float(random.randint(1, 9)))
+             for k, (i, j) in enumerate(pairs)]
+    m = len(edges)
+
+    print('{0} vertices, {1} edges'.format(n, m))
+    print('{0:<18}{1:>12}{2:>12}{3:>14}'.format(
+        'representation', 'B/vertex', 'B/edge', 'total bytes'))
+    g, vertex_bytes = traced(build_digraph, tags, [], BaselineVertex)
+    g, total_bytes = traced(build_digraph, tags, edges, BaselineVertex)
+    report('Digraph (before)', n, m, vertex_bytes, total_bytes)
+    g = None
+    g, vertex_bytes = traced(build_digraph, tags, [])
+    g, total_bytes = traced(build_digraph, tags, edges)
+    report('Digraph', n, m, vertex_bytes, total_bytes)
+    frozen, vertex_bytes = traced(FrozenDigraph, build_digraph(tags, []))
+    frozen, total_bytes = traced(g.freeze)
+    report('FrozenDigraph', n, m, vertex_bytes, total_bytes)
+    g = None
+    compact, vertex_bytes = traced(build_compact, tags, [])
+    compact, total_bytes = traced(build_compact, tags, edges)
+    report('CompactDigraph', n, m, vertex_bytes, total_bytes)
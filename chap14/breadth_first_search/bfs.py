@@ -32,7 +32,7 @@ if __name__ == '__main__':
     g = graph_read('example.txt')
     print('>> the original digraph:')
     print(g)
-    breadth_first_search(g, g.vertex('s'))
+    result = breadth_first_search(g, g.vertex('s'))
     for v in g.vertices():
         print('{0} from: {1} distance: {2}'
-              .format(v, v.predecessor, v.distance))
+              .format(v, result.predecessor[v], result.distance[v]))
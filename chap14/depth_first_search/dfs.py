@@ -32,7 +32,8 @@ if __name__ == '__main__':
     g = graph_read('example.txt')
     print('>> the original digraph:')
     print(g)
-    complete_depth_first_search(g)
+    result = complete_depth_first_search(g)
     for v in g.vertices():
         print('{0} from: {1}\torder: {2}/{3}'
-              .format(v, v.predecessor, v.discover, v.finish))
+              .format(v, result.predecessor[v], result.discover[v],
+                      result.finish[v]))
@@ -33,8 +33,8 @@ if __name__ == '__main__':
     print('>> the original digraph:')
     print(g)
     print('\n>> remove ege (b->a):')
-    g.remove_edge(Vertex('B'), Vertex('A'))
+    g.remove_edge(g.vertex('B'), g.vertex('A'))
     print(g)
     print('\n>> remove vertex (a):')
-    g.remove_vertex(Vertex('A'))
+    g.remove_vertex(g.vertex('A'))
     print(g)
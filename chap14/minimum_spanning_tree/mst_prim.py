@@ -30,9 +30,9 @@ from algorithms.graphalgo import *
 
 if __name__ == '__main__':
     g = graph_read('example.txt')
-    prim(g, g.vertex('a'))
+    result = prim(g, g.vertex('a'))
     print(g)
     for v in g.vertices():
         print('{0} from {1}\t distance: {2}'.format(v,
-                                                    v.predecessor,
-                                                    v.distance))
\ No newline at end of file
+                                                    result.predecessor[v],
+                                                    result.distance[v]))
\ No newline at end of file
@@ -30,7 +30,8 @@ from algorithms.graphalgo import *
 
 if __name__ == '__main__':
     g = graph_read('dijkstra.txt')
-    dijkstra(g, g.vertex('s'))
+    result = dijkstra(g, g.vertex('s'))
     print(g)
     for v in g.vertices():
-        print('{0}: {1}, from {2}'.format(v, v.distance, v.predecessor))
\ No newline at end of file
+        print('{0}: {1}, from {2}'.format(v, result.distance[v],
+                                          result.predecessor[v]))
\ No newline at end of file
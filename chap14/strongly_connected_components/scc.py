@@ -32,6 +32,6 @@ if __name__ == '__main__':
     g = graph_read('example2.txt')
     print('>> the original digraph:')
     print(g)
-    kosaraju(g)
+    result = kosaraju(g)
     for v in g.vertices():
-        print('{0} -- {1}'.format(v.predecessor, v))
+        print('{0} -- {1}'.format(result.predecessor[v], v))